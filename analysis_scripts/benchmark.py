@@ -0,0 +1,257 @@
+import os
+import io
+import sys
+import gc
+import json
+import time
+import hashlib
+import argparse
+import contextlib
+import network_analyzer as na
+import device_comparison as dc
+from instrumentation import reset_peak_rss, rss_mib, round_mib, environment
+from synthetic_logs import generate_logs, DEFAULT_OPERATORS, PCI_CHURN, STATIONARY_SHARE, ROWS_PER_FILE
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+# Times every pipeline stage on seeded synthetic logs (synthetic_logs.py) and compares the timings, peak
+# memory and result fingerprints against a stored baseline. Datasets are generated once per parameter set
+# and reused. Peak memory is the main process' resident set during the stage (Linux resets the counter
+# per stage; elsewhere it is the process-wide peak so far).
+BENCH_SIZES = [10_000, 100_000, 1_000_000]  # rows per device
+BENCH_DIR = "bench_data"
+BASELINE_FILE = "bench_baseline.json"
+RESULTS_FILE = "bench_results.json"
+BENCH_DEVICES = 2  # handsets on the same route, so match_locations has a pair to match
+BENCH_SEED = 0
+BENCH_REPEAT = 1  # runs per dataset; each stage keeps its best time and peak
+
+# A stage regresses when it is slower than baseline x TIME_TOLERANCE + TIME_SLACK_S (timer noise on tiny
+# stages), or its peak grows beyond baseline x MEMORY_TOLERANCE + MEMORY_SLACK_MIB
+TIME_TOLERANCE = 1.25
+TIME_SLACK_S = 0.1
+MEMORY_TOLERANCE = 1.2
+MEMORY_SLACK_MIB = 16
+
+# ==========================================
+# MEASUREMENT
+# ==========================================
+def measure(stage, timings, fn, *args, **kwargs):
+    """ Runs fn quietly (its prints are swallowed), recording seconds and peak MiB under `stage` """
+    gc.collect()
+    reset_peak_rss()
+    start_mib = rss_mib()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn(*args, **kwargs)
+    timings[stage] = {
+        'seconds': round(time.perf_counter() - t0, 4),
+        'peak_mib': round_mib(rss_mib('VmHWM')),  # None where the platform can't report it
+        'start_mib': round_mib(start_mib)
+    }
+    return result
+
+# ==========================================
+# DATASETS & STAGES
+# ==========================================
+def dataset_params(rows, args):
+    return {
+        'rows': rows, 'devices': args.devices, 'slots': args.slots, 'operators': list(args.operators),
+        'pci_churn': args.pci_churn, 'stationary_share': args.stationary, 'rows_per_file': args.rows_per_file,
+        'seed': args.seed
+    }
+
+def ensure_dataset(params, bench_dir=BENCH_DIR):
+    """ Directory holding the logs for `params`, generated on first use (keyed by a hash of the params) """
+    key = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:10]
+    path = os.path.join(bench_dir, f"rows_{params['rows']}_{key}")
+    meta = os.path.join(path, "dataset.json")
+    if not os.path.exists(meta):
+        print(f"🧪 Generating {params['rows']:,} rows x {params['devices']} device(s) in '{path}'...")
+        generate_logs(path, params['rows'], params['rows_per_file'], params['devices'], params['operators'],
+                      params['slots'], params['pci_churn'], params['stationary_share'], params['seed'])
+        with open(meta, 'w', encoding='utf-8') as f:
+            json.dump(params, f, indent=1)
+    return path
+
+def device_pair(path):
+    """ The first recording of the first two devices (device k starts k seconds after device 0) """
+    logs = sorted(f for f in os.listdir(path) if f.startswith("Signal_Log_Advanced_"))
+    return [os.path.join(path, f) for f in logs[:2]]
+
+def file_sha1(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def run_in_memory_stages(timings):
+    """ The run_in_memory pipeline, stage by stage; returns the result fingerprint """
+    df = measure('load_all_csvs', timings, na.load_all_csvs, use_cache=False)
+    df_clean = measure('remove_stationary_data', timings, na.remove_stationary_data, df)
+    n_rows = len(df)
+    del df
+    km, unique_km = measure('analyze_data', timings, na.analyze_data, df_clean)
+    split, combined = measure('spatial_averaging', timings, na.spatial_averaging, df_clean)
+    return {
+        'rows': n_rows,
+        'clean_rows': len(df_clean),
+        'km_travelled': round(float(km), 3),
+        'unique_km': round(float(unique_km), 3),
+        'map_cells': len(split),
+        'combined_cells': len(combined),
+        'map_rsrp_sum': round(float(split['rsrp'].sum()), 1),
+        'report_sha1': file_sha1(os.path.join(na.EXPORT_DIR, 'network_comparison_report.txt'))
+    }
+
+def run_streaming_stages(timings, chunksize=na.STREAM_CHUNK_ROWS):
+    """ The run_streaming pipeline (two passes over the logs), for sizes beyond RAM """
+    log_files, _ = na.find_signal_logs()
+    log_files = sorted(log_files)
+    pairs, maps, n_clean = measure('stream_partials', timings, na.stream_partials, log_files, chunksize)
+    km, unique_km = measure('analyze_stream', timings, na.analyze_stream, log_files, pairs, chunksize)
+    split, combined = measure('finalize_maps', timings, na.finalize_maps, maps)
+    return {
+        'clean_rows': int(n_clean),
+        'km_travelled': round(float(km), 3),
+        'unique_km': round(float(unique_km), 3),
+        'map_cells': len(split),
+        'combined_cells': len(combined),
+        'map_rsrp_sum': round(float(split['rsrp'].sum()), 1),
+        'report_sha1': file_sha1(os.path.join(na.EXPORT_DIR, 'network_comparison_report.txt'))
+    }
+
+def run_matching_stage(path, timings, operator):
+    """ match_locations on one operator (SIM1 of the first day), as the batch comparison matches them """
+    if dc.kdtree_available():
+        import scipy.spatial  # imported lazily by device_comparison; keep the import out of the timing
+    logs = device_pair(path)
+    dfs = [dc.filter_operator(dc.read_device_log(f), operator) for f in logs]
+    merged = measure('match_locations', timings, dc.match_locations, dfs, verbose=False)
+    return {'matched': len(merged), 'match_delta_sum': int((merged['rsrp_0'] - merged['rsrp_1']).sum())}
+
+def best_of(runs):
+    """ Per stage, the fastest time and the lowest peak over repeated runs """
+    return {
+        stage: {k: min((run[stage][k] for run in runs if run[stage][k] is not None), default=None)
+                for k in runs[0][stage]}
+        for stage in runs[0]
+    }
+
+def run_size(params, stream=False, chunksize=na.STREAM_CHUNK_ROWS, bench_dir=BENCH_DIR, repeat=BENCH_REPEAT):
+    """ {'params', 'stages': {stage: timing}, 'results': fingerprint} for one dataset """
+    path = ensure_dataset(params, bench_dir)
+    runs = []
+    cwd = os.getcwd()
+    os.chdir(path)  # network_analyzer reads the logs in (and exports to) the working directory
+    try:
+        os.makedirs(na.EXPORT_DIR, exist_ok=True)
+        for _ in range(max(repeat, 1)):
+            timings = {}
+            if stream:
+                results = run_streaming_stages(timings, chunksize)
+            else:
+                results = run_in_memory_stages(timings)
+            if params['devices'] > 1:
+                results.update(run_matching_stage('.', timings, params['operators'][0]))
+            runs.append(timings)
+    finally:
+        os.chdir(cwd)
+    return {'params': params, 'stages': best_of(runs), 'results': results}
+
+# ==========================================
+# BASELINE COMPARISON
+# ==========================================
+def compare_run(run, base):
+    """ Regression messages for one dataset (empty when within tolerance and the results match) """
+    problems = []
+    for stage, t in run['stages'].items():
+        b = base['stages'].get(stage)
+        if b is None: continue
+        if t['seconds'] > b['seconds'] * TIME_TOLERANCE + TIME_SLACK_S:
+            problems.append(f"{stage}: {t['seconds']:.3f}s vs {b['seconds']:.3f}s baseline")
+        if None in (t['peak_mib'], b['peak_mib']): continue
+        if t['peak_mib'] > b['peak_mib'] * MEMORY_TOLERANCE + MEMORY_SLACK_MIB:
+            problems.append(f"{stage}: peak {t['peak_mib']:.0f} MiB vs {b['peak_mib']:.0f} MiB baseline")
+    for key, value in base['results'].items():
+        if run['results'].get(key) != value:
+            problems.append(f"result '{key}': {run['results'].get(key)!r} vs {value!r} baseline")
+    return problems
+
+def print_run(name, run, base=None):
+    print(f"\n📏 {name}: {run['results'].get('clean_rows', 0):,} clean rows")
+    for stage, t in run['stages'].items():
+        peak = f"{t['peak_mib']:>8.0f} MiB peak" if t['peak_mib'] is not None else "    peak n/a"
+        line = f"  {stage:<24} {t['seconds']:>9.3f} s  {peak}"
+        b = base['stages'].get(stage) if base else None
+        if b:
+            line += f"   ({t['seconds'] / max(b['seconds'], 1e-9):.2f}x time"
+            if None not in (t['peak_mib'], b['peak_mib']):
+                line += f", {t['peak_mib'] / max(b['peak_mib'], 1e-9):.2f}x mem"
+            line += ")"
+        print(line)
+
+def load_json(path):
+    if not os.path.exists(path): return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+
+def run_benchmarks(args):
+    mode = 'stream' if args.stream else 'memory'
+    baseline = None if args.update_baseline else load_json(args.baseline)
+    if baseline and baseline.get('environment') != environment():
+        print("⚠️ Baseline was recorded on a different machine / library versions; timings are only indicative.")
+
+    summary = {'environment': environment(), 'runs': {}}
+    problems = []
+    for rows in args.sizes:
+        name = f"{mode}:{rows}"
+        run = run_size(dataset_params(rows, args), args.stream, args.chunk_rows, args.bench_dir, args.repeat)
+        base = baseline['runs'].get(name) if baseline else None
+        if base and base['params'] != run['params']:
+            print(f"⚠️ {name}: baseline was recorded with different generator settings; not compared.")
+            base = None
+        print_run(name, run, base)
+        if base:
+            problems += [f"{name} {p}" for p in compare_run(run, base)]
+        summary['runs'][name] = run
+
+    save_json(RESULTS_FILE, summary)
+    print(f"\n💾 Results saved to '{RESULTS_FILE}'")
+    if args.update_baseline:
+        previous = load_json(args.baseline) or {'runs': {}}
+        previous['runs'].update(summary['runs'])
+        previous['environment'] = summary['environment']
+        save_json(args.baseline, previous)
+        print(f"📌 Baseline updated: '{args.baseline}'")
+    elif baseline is None:
+        print(f"ℹ️ No baseline at '{args.baseline}' (record one with --update-baseline).")
+    elif problems:
+        print(f"\n❌ {len(problems)} regression(s):")
+        for p in problems:
+            print(f"  - {p}")
+        return 1
+    else:
+        print("✅ Within baseline tolerances.")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline on synthetic SignalService logs")
+    parser.add_argument('--sizes', type=int, nargs='+', default=BENCH_SIZES, help="rows per device, e.g. 10000 50000000")
+    parser.add_argument('--stream', action='store_true', help="benchmark the --stream pipeline instead")
+    parser.add_argument('--chunk-rows', type=int, default=na.STREAM_CHUNK_ROWS)
+    parser.add_argument('--devices', type=int, default=BENCH_DEVICES)
+    parser.add_argument('--slots', type=int, default=2)
+    parser.add_argument('--operators', nargs='+', default=DEFAULT_OPERATORS)
+    parser.add_argument('--pci-churn', type=float, default=PCI_CHURN)
+    parser.add_argument('--stationary', type=float, default=STATIONARY_SHARE)
+    parser.add_argument('--rows-per-file', type=int, default=ROWS_PER_FILE)
+    parser.add_argument('--seed', type=int, default=BENCH_SEED)
+    parser.add_argument('--repeat', type=int, default=BENCH_REPEAT, help="runs per size; best time/peak is kept")
+    parser.add_argument('--bench-dir', default=BENCH_DIR)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--update-baseline', action='store_true', help="store this run as the new baseline")
+    sys.exit(run_benchmarks(parser.parse_args()))
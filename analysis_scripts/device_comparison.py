@@ -2,55 +2,213 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+import re
+import json
+import argparse
+import functools
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from spatial_index import cell_keys, cell_centers
+from trajectory import radian_columns, step_km, EARTH_RADIUS_KM
+from labels import smart_merge_names, normalize_labels, INVALID_LABELS
 
-# GPS Rounding (~11 meters precision)
+# GPS Rounding (~11 meters precision), only used by the grid-cell fallback matcher
 GEO_PRECISION = 4 
 
-def clean_and_load(filepath, label, target_operator=None):
+# 📍 MATCHING TOLERANCES
+MATCH_DISTANCE_M = 15  # max distance between two devices' samples to count as the same spot
+MATCH_TIME_S = 2  # max time offset (> 0) when both logs have timestamps; None matches on position only
+
+# 📥 COLUMNS READ FROM EACH LOG (header names are matched after capitalize(), e.g. 'RSRP' -> 'Rsrp')
+LOG_COLUMNS = {'Latitude': 'lat', 'Longitude': 'lon', 'Rsrp': 'rsrp', 'Operator': 'operator', 'Timestamp': 'timestamp'}
+
+# 🧮 BATCH MODE (--manifest)
+BOOTSTRAP_SAMPLES = 1000
+CONFIDENCE_LEVEL = 0.95
+BATCH_WORKERS = os.cpu_count() or 1
+
+def read_device_log(filepath):
+    """ Reads only LOG_COLUMNS, drops unusable rows and keeps operator names as a categorical """
+    df = pd.read_csv(filepath, usecols=lambda c: c.capitalize() in LOG_COLUMNS)
+    df.columns = [LOG_COLUMNS[c.capitalize()] for c in df.columns]
+    
+    # Numeric Cleaning
+    df['rsrp'] = pd.to_numeric(df['rsrp'], errors='coerce')
+    df = df.dropna(subset=['lat', 'lon', 'rsrp'])
+    df['datetime'] = parse_log_times(df['timestamp'], filepath) if 'timestamp' in df.columns else pd.NaT
+    if 'operator' in df.columns:
+        df['operator'] = df['operator'].astype('category')
+    
+    df = df.drop(columns='timestamp', errors='ignore').reset_index(drop=True)
+    df['lat_rad'], df['lon_rad'], df['cos_lat'] = radian_columns(df['lat'], df['lon'])
+    return df
+
+def filter_operator(df, target_operator):
+    """ Rows whose operator name contains `target_operator` (case-insensitive); each distinct name is tested once """
+    if not target_operator or 'operator' not in df.columns: return df
+    names = df['operator'].cat.categories
+    hits = names[names.astype(str).str.contains(target_operator, case=False, regex=False)]
+    return df[df['operator'].isin(hits)].reset_index(drop=True)
+
+def clean_and_load(filepath, label, target_operator=None, reader=read_device_log):
     if not os.path.exists(filepath):
         print(f"❌ File not found: {filepath}")
         return pd.DataFrame()
 
     try:
-        df = pd.read_csv(filepath)
-        # Standardize Columns
-        df.columns = [c.capitalize() for c in df.columns]
-        rename_map = {'Latitude': 'lat', 'Longitude': 'lon', 'Rsrp': 'rsrp', 'Snr': 'snr', 'Operator': 'operator'}
-        df = df.rename(columns=rename_map)
-        
-        # Numeric Cleaning
-        df['rsrp'] = pd.to_numeric(df['rsrp'], errors='coerce')
-        df = df.dropna(subset=['lat', 'lon', 'rsrp'])
-
-        # --- OPERATOR FILTERING ---
-        if target_operator and 'operator' in df.columns:
-            mask = df['operator'].astype(str).str.contains(target_operator, case=False, na=False)
-            df = df[mask]
-        
+        df = filter_operator(reader(filepath), target_operator)
         print(f"✅ Loaded {label}: {len(df)} points" + (f" (Filtered for '{target_operator}')" if target_operator else ""))
-        return df[['lat', 'lon', 'rsrp']]
+        return df
     except Exception as e:
         print(f"❌ Error loading {filepath}: {e}")
         return pd.DataFrame()
 
-def match_locations(dfs):
-    """ Matches points where ALL phones were present """
-    print("\n🔄 Matching GPS locations across devices...")
-    
-    # Round coordinates for grid matching
+def parse_log_times(raw, filepath):
+    """ HH:mm:ss timestamps, placed on the date in the Signal_Log_Advanced_<yyyyMMdd>_<HHmmss>.csv name """
+    times = pd.to_datetime(raw, format='%H:%M:%S', errors='coerce')
+    if times.isna().all() and raw.notna().any():
+        return pd.to_datetime(raw, format='mixed', errors='coerce')
+    day = re.search(r'(\d{8})_\d{6}', os.path.basename(filepath))
+    day = pd.to_datetime(day.group(1), format='%Y%m%d', errors='coerce') if day else pd.NaT
+    if pd.notna(day):
+        times = times - pd.Timestamp('1900-01-01') + day
+    return times
+
+def kdtree_available():
+    return importlib.util.find_spec('scipy') is not None
+
+def sphere_points(df):
+    """ Samples as 3-D points (metres) on the Earth sphere; straight-line distance orders like great-circle """
+    lat, lon = df['lat_rad'].to_numpy(), df['lon_rad'].to_numpy()
+    cos_lat = np.cos(lat)
+    return EARTH_RADIUS_KM * 1000.0 * np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+def match_in_space(ref, other, max_distance_m=MATCH_DISTANCE_M):
+    """ Row of `other` nearest to each `ref` sample within max_distance_m (-1 if none), via a KD-tree """
+    from scipy.spatial import cKDTree
+    dist, idx = cKDTree(sphere_points(other)).query(sphere_points(ref), k=1, distance_upper_bound=max_distance_m)
+    return np.where(np.isfinite(dist), idx, -1)
+
+def match_in_space_time(ref, other, max_time_s=MATCH_TIME_S, max_distance_m=MATCH_DISTANCE_M, k=8):
+    """
+    Like match_in_space, but on a 4-D KD-tree whose time axis is scaled so max_time_s weighs as much as
+    max_distance_m; the nearest candidate within BOTH tolerances wins. The first query asks for k
+    candidates per row of `other`'s busiest timestamp (dual-SIM logs write two rows per tick); rows
+    whose candidates all fail but fill the search ball are queried again with twice as many, so no
+    partner inside the ball is missed.
+    """
+    from scipy.spatial import cKDTree
+    t0 = ref['datetime'].min()
+    scale = max_distance_m / max_time_s
+    def points(df):
+        t = (df['datetime'] - t0).dt.total_seconds().to_numpy()
+        return np.column_stack([sphere_points(df), t * scale])
+
+    other_pts = points(other)
+    valid = ~np.isnan(other_pts[:, 3])
+    other_rows = np.flatnonzero(valid)
+    idx = np.full(len(ref), -1, dtype=np.int64)
+    ref_pts = points(ref)
+    ref_rows = np.flatnonzero(~np.isnan(ref_pts[:, 3]))
+    if not len(other_rows) or not len(ref_rows): return idx
+
+    n_other = len(other_rows)
+    per_tick = int(other['datetime'].value_counts().max())
+    k = min(k * per_tick, n_other)
+    tree = cKDTree(other_pts[valid])
+    while len(ref_rows):
+        _, cand = tree.query(ref_pts[ref_rows], k=k, distance_upper_bound=max_distance_m * np.sqrt(2))
+        cand = cand.reshape(len(ref_rows), k)
+        ok = cand < n_other
+        safe = other_rows[np.where(ok, cand, 0)]
+        d_space = np.linalg.norm(other_pts[safe, :3] - ref_pts[ref_rows, None, :3], axis=2)
+        d_time = np.abs(other_pts[safe, 3] - ref_pts[ref_rows, None, 3]) / scale
+        ok &= (d_space <= max_distance_m) & (d_time <= max_time_s)
+
+        first = ok.argmax(axis=1)
+        hit = ok[np.arange(len(ref_rows)), first]
+        idx[ref_rows[hit]] = safe[np.arange(len(ref_rows)), first][hit]
+        if k == n_other: break
+        # All k candidates inside the ball but none within both tolerances: there may be more further out
+        ref_rows = ref_rows[~hit & (cand[:, -1] < n_other)]
+        k = min(2 * k, n_other)
+    return idx
+
+def match_in_time(ref, other, max_time_s=MATCH_TIME_S, max_distance_m=MATCH_DISTANCE_M):
+    """
+    Fallback without scipy: row of `other` closest in time to each `ref` sample within max_time_s
+    (merge_asof), kept if within max_distance_m
+    """
+    left = pd.DataFrame({'datetime': ref['datetime'], 'ref_row': np.arange(len(ref))}).dropna()
+    right = pd.DataFrame({'datetime': other['datetime'], 'row': np.arange(len(other))}).dropna()
+    pairs = pd.merge_asof(
+        left.sort_values('datetime'), right.sort_values('datetime'), on='datetime',
+        direction='nearest', tolerance=pd.Timedelta(seconds=max_time_s)
+    ).dropna(subset=['row'])
+
+    ref_rows, rows = pairs['ref_row'].to_numpy(), pairs['row'].to_numpy(dtype=np.int64)
+    d_km = step_km(ref['lat_rad'].to_numpy()[ref_rows], ref['lon_rad'].to_numpy()[ref_rows], ref['cos_lat'].to_numpy()[ref_rows],
+                   other['lat_rad'].to_numpy()[rows], other['lon_rad'].to_numpy()[rows], other['cos_lat'].to_numpy()[rows])
+    close = d_km * 1000.0 <= max_distance_m
+
+    idx = np.full(len(ref), -1, dtype=np.int64)
+    idx[ref_rows[close]] = rows[close]
+    return idx
+
+def match_cells(dfs):
+    """ Fallback without scipy: points whose rounded grid cell ALL phones visited, averaged per cell """
     for i, df in enumerate(dfs):
-        df['grid_lat'] = df['lat'].round(GEO_PRECISION)
-        df['grid_lon'] = df['lon'].round(GEO_PRECISION)
+        df['cell'] = cell_keys(df['lat'], df['lon'], GEO_PRECISION)
         # Aggregate duplicates in same grid
-        dfs[i] = df.groupby(['grid_lat', 'grid_lon'])['rsrp'].mean().reset_index().rename(columns={'rsrp': f'rsrp_{i}'})
+        dfs[i] = df.groupby('cell')['rsrp'].mean().rename(f'rsrp_{i}')
 
     # Start merging
-    merged = dfs[0]
+    merged = dfs[0].to_frame()
     for i in range(1, len(dfs)):
-        merged = pd.merge(merged, dfs[i], on=['grid_lat', 'grid_lon'], how='inner')
+        merged = merged.join(dfs[i], how='inner')
     
+    grid_lat, grid_lon = cell_centers(merged.index, GEO_PRECISION)
+    merged = merged.reset_index(drop=True)
+    merged.insert(0, 'lat', grid_lat)
+    merged.insert(1, 'lon', grid_lon)
     return merged
 
+def match_locations(dfs, max_distance_m=MATCH_DISTANCE_M, max_time_s=MATCH_TIME_S, verbose=True):
+    """
+    Matches every sample of the first device with the nearest sample of each other device and keeps the
+    spots where ALL phones were present. With timestamps on every log, partners must be within
+    max_time_s and max_distance_m (space-time KD-tree); otherwise the closest in space within max_distance_m.
+    """
+    if not max_distance_m > 0:
+        raise ValueError(f"max_distance_m must be > 0, got {max_distance_m}")
+    if max_time_s is not None and not max_time_s > 0:
+        raise ValueError(f"max_time_s must be > 0 (None matches on position only), got {max_time_s}")
+    timed = max_time_s is not None and all(df['datetime'].notna().any() for df in dfs)
+    kdtree = kdtree_available()
+    if not timed and not kdtree:
+        if verbose: print("\n🔄 Matching GPS locations across devices (grid cells; install 'scipy' for nearest-neighbour matching)...")
+        return match_cells(dfs)
+    
+    rule = f"≤{max_distance_m} m" + (f", ≤{max_time_s} s apart" if timed else "")
+    if verbose: print(f"\n🔄 Matching GPS locations across devices ({rule})...")
+    ref = dfs[0]
+    merged = ref[['datetime', 'lat', 'lon', 'rsrp']].rename(columns={'rsrp': 'rsrp_0'})
+    found = np.ones(len(ref), dtype=bool)
+    for i, other in enumerate(dfs[1:], start=1):
+        if timed and kdtree:
+            idx = match_in_space_time(ref, other, max_time_s, max_distance_m)
+        elif timed:
+            idx = match_in_time(ref, other, max_time_s, max_distance_m)
+        else:
+            idx = match_in_space(ref, other, max_distance_m)
+        found &= idx >= 0
+        merged[f'rsrp_{i}'] = other['rsrp'].to_numpy()[np.maximum(idx, 0)]
+
+    merged = merged[found]
+    if timed:
+        return merged.sort_values('datetime', kind='stable').reset_index(drop=True)
+    return merged.drop(columns='datetime').reset_index(drop=True)
+
 def generate_battle_report(merged, labels):
     print("\n" + "="*60)
     print(f"🤖 HARDWARE BATTLE: {labels[0]} vs {labels[1]}")
@@ -96,6 +254,131 @@ def plot_chart(merged, labels):
     plt.savefig(out_img)
     print(f"\n📊 Chart saved to '{out_img}'")
 
+# ==========================================
+# BATCH MODE: every device pair, per operator
+# ==========================================
+def load_manifest(path):
+    """
+    JSON manifest, paths relative to the manifest file, either a plain device list
+      [{"label": "S25 Ultra", "path": "s25.csv"}, ...]
+    or an object with optional operators
+      {"devices": [{"label": "S25 Ultra", "path": "s25.csv"}, ...], "operators": ["A1", "Yettel"]}
+    Without "operators" every pair is compared on all samples, matched operator by operator.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {'devices': manifest}
+    base = os.path.dirname(os.path.abspath(path))
+    devices = [(d['label'], os.path.join(base, d['path'])) for d in manifest['devices']]
+    return devices, manifest.get('operators') or [None]
+
+def bootstrap_ci(values, n_boot=BOOTSTRAP_SAMPLES, level=CONFIDENCE_LEVEL, seed=0):
+    """ Percentile bootstrap interval of the mean, resampled in batches of ~5M draws to bound memory """
+    n = len(values)
+    if n < 2 or n_boot <= 0: return np.nan, np.nan
+    rng = np.random.default_rng(seed)
+    means = np.empty(n_boot)
+    batch = max(1, 5_000_000 // n)
+    for start in range(0, n_boot, batch):
+        size = min(batch, n_boot - start)
+        means[start:start + size] = values[rng.integers(0, n, size=(size, n))].mean(axis=1)
+    tail = (1 - level) / 2 * 100
+    low, high = np.percentile(means, [tail, 100 - tail])
+    return low, high
+
+@functools.lru_cache(maxsize=None)
+def cached_device_log(path):
+    """ Per-process memo, so a batch worker reads each device log once however many pairs it compares """
+    return read_device_log(path)
+
+def operator_groups(df):
+    """ {operator: rows} with SPN variants merged (smart_merge_names); one group when there is no operator column """
+    if 'operator' not in df.columns: return {None: df}
+    names = normalize_labels(df['operator'], smart_merge_names)
+    return {op: part for op, part in df.groupby(names, observed=True) if op not in INVALID_LABELS}
+
+def matched_deltas(df_a, df_b, by_operator=True):
+    """ RSRP of A minus B on matched spots; with by_operator, samples only match within the same operator """
+    diffs = []
+    groups_a, groups_b = (operator_groups(df_a), operator_groups(df_b)) if by_operator else ({None: df_a}, {None: df_b})
+    for op in sorted(groups_a.keys() & groups_b.keys(), key=str):
+        a, b = groups_a[op].reset_index(drop=True), groups_b[op].reset_index(drop=True)
+        merged = match_locations([a, b], verbose=False)
+        diffs.append((merged['rsrp_0'] - merged['rsrp_1']).to_numpy())
+    return np.concatenate(diffs) if diffs else np.array([])
+
+def battle_pair(job):
+    """ Worker: matched-spot stats of device A minus device B for one operator (None = every operator) """
+    operator, (label_a, path_a), (label_b, path_b), n_boot, seed = job
+    row = {'operator': operator or 'ALL', 'device_a': label_a, 'device_b': label_b}
+    df_a = filter_operator(cached_device_log(path_a), operator)
+    df_b = filter_operator(cached_device_log(path_b), operator)
+    # An operator filter already keeps one operator (e.g. SIM1 of both phones); 'ALL' is matched operator by operator
+    diff = matched_deltas(df_a, df_b, by_operator=operator is None) if len(df_a) and len(df_b) else np.array([])
+    if not len(diff):
+        return {**row, 'spots': 0}
+    
+    ci_low, ci_high = bootstrap_ci(diff, n_boot, seed=seed)
+    return {
+        **row,
+        'spots': len(diff),
+        'mean_delta_db': diff.mean(),
+        'ci_low': ci_low,
+        'ci_high': ci_high,
+        'a_better_pct': (diff > 0).mean() * 100,
+        'b_better_pct': (diff < 0).mean() * 100
+    }
+
+def battle_matrix(pairs):
+    """ Device x device table per operator: mean dBm of the row device minus the column device, with CI """
+    mirrored = pairs.rename(columns={'device_a': 'device_b', 'device_b': 'device_a'}).assign(
+        mean_delta_db=-pairs['mean_delta_db'], ci_low=-pairs['ci_high'], ci_high=-pairs['ci_low'])
+    both = pd.concat([pairs, mirrored], ignore_index=True).dropna(subset=['mean_delta_db'])
+    cell = both.apply(lambda r: f"{r['mean_delta_db']:+.2f} [{r['ci_low']:+.2f}, {r['ci_high']:+.2f}]", axis=1)
+    return both.assign(cell=cell).pivot_table(index=['operator', 'device_a'], columns='device_b',
+                                              values='cell', aggfunc='first').fillna("")
+
+def run_batch(manifest_path, workers=BATCH_WORKERS, n_boot=BOOTSTRAP_SAMPLES):
+    print("="*60)
+    print("📱 HARDWARE SIGNAL COMPARISON TOOL (BATCH)")
+    print("="*60)
+    
+    devices, operators = load_manifest(manifest_path)
+    # Jobs carry file paths, not frames: each worker loads a log once (cached_device_log) instead of
+    # receiving both frames pickled for every pair; forked workers inherit the logs loaded here
+    logs = [(label, path) for label, path in devices if not clean_and_load(path, label, reader=cached_device_log).empty]
+    if len(logs) < 2:
+        print("❌ Need at least 2 valid files.")
+        return
+
+    jobs = []
+    for op in operators:
+        for i in range(len(logs)):
+            for j in range(i + 1, len(logs)):
+                jobs.append((op, logs[i], logs[j], n_boot, len(jobs)))
+    
+    print(f"\n🔄 Comparing {len(jobs)} device pairs across {len(operators)} operator group(s)...")
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            rows = list(pool.map(battle_pair, jobs))
+    else:
+        rows = [battle_pair(job) for job in jobs]
+    
+    pairs = pd.DataFrame(rows)
+    pairs.to_csv("battle_pairs.csv", index=False)
+    print("💾 Pair results saved to 'battle_pairs.csv'")
+    if 'mean_delta_db' not in pairs or pairs['mean_delta_db'].isna().all():
+        print("⚠️ No matching GPS locations found.")
+        return
+    
+    matrix = battle_matrix(pairs)
+    level = f"{CONFIDENCE_LEVEL:.0%}"
+    print(f"\n📡 MEAN RSRP DELTA, ROW minus COLUMN (dB, {level} bootstrap CI):")
+    print(matrix.to_string())
+    matrix.to_csv("battle_matrix.csv")
+    print("💾 Matrix saved to 'battle_matrix.csv'")
+
 def main():
     print("="*60)
     print("📱 HARDWARE SIGNAL COMPARISON TOOL")
@@ -142,4 +425,13 @@ def main():
     print("💾 Data saved to 'comparison_data.csv'")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Compare antenna sensitivity between devices")
+    parser.add_argument('--manifest', help="JSON manifest of device logs; runs every pair non-interactively")
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help="processes used in --manifest mode")
+    parser.add_argument('--bootstrap', type=int, default=BOOTSTRAP_SAMPLES, help="bootstrap resamples per pair")
+    args = parser.parse_args()
+
+    if args.manifest:
+        run_batch(args.manifest, args.workers, args.bootstrap)
+    else:
+        main()
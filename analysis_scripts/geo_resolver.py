@@ -1,8 +1,15 @@
 import re
+import csv
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+import random
+import sqlite3
+import threading
 import time
 import os
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # ================= CONFIGURATION =================
 # We now ask the user for these inputs instead of hardcoding
@@ -13,9 +20,210 @@ HEADERS = {
     "Accept-Language": "en-US,en;q=0.9"
 }
 
+# 🌐 NETWORK (be polite: a few connections, a steady request rate)
+MAX_WORKERS = 4  # concurrent page downloads
+RATE_PER_SECOND = 2.0  # token bucket refill rate
+BURST = 4  # token bucket size
+TIMEOUT = 10
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 1.0  # doubled on every retry, plus jitter
+MAX_BACKOFF_SECONDS = 60.0  # cap on any single wait, including a server's Retry-After
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+OUTPUT_FILE = "resolved_coordinates.csv"
+
+# 💾 URL CACHE (SQLite, keyed by normalized URL; only misses and expired entries are downloaded)
+CACHE_DB = "geo_cache.sqlite"
+CACHE_TTL_DAYS = 30
+TRACKING_PARAMS = ('utm_', 'entry', 'g_ep', 'g_st')  # query keys (prefixes) that don't change the place
+
+# Coordinate patterns
+SEARCH_PATTERN = r'search/(\d+\.\d+),(\d+\.\d+)'
+HTML_PATTERN = r'\[\s*(4[12]\.\d+)\s*,\s*(2[234]\.\d+)\s*\]'  # "center" of the view
+META_PATTERN = r'content=".*?center=(\d+\.\d+)%2C(\d+\.\d+)'
+
+class TokenBucket:
+    """ Thread-safe token bucket: acquire() blocks until one more request may go out """
+    def __init__(self, rate=RATE_PER_SECOND, capacity=BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def make_session(headers=HEADERS, workers=MAX_WORKERS):
+    """ One keep-alive connection pool shared by all worker threads """
+    session = requests.Session()
+    session.headers.update(headers)
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def read_url_items(lines):
+    """ (ID, URL) per line that holds a link; IDs count down from the number of lines """
+    items = []
+    for i, line in enumerate(lines):
+        if not line.strip(): continue
+
+        # Calculate ID (assuming reverse order 186 -> 1, optional logic)
+        current_id = len(lines) - i
+
+        # Extract URL
+        url_match = re.search(r'(https?://[^\s]+)', line)
+        if url_match:
+            items.append((current_id, url_match.group(1)))
+    return items
+
+def coords_from_url(url):
+    """ METHOD A: Direct Search URL (no download) """
+    match_search = re.search(SEARCH_PATTERN, url)
+    if match_search:
+        return float(match_search.group(1)), float(match_search.group(2)), "direct"
+    return None
+
+def coords_from_html(html_content):
+    """ METHOD B: Place page content -> (lat, lon, method) or None """
+    # 1. Try to find the "center" of the view in HTML
+    match_content = re.search(HTML_PATTERN, html_content)
+    if match_content:
+        return float(match_content.group(1)), float(match_content.group(2)), "html"
+
+    # 2. Try to find the URL inside the HTML meta tags
+    match_meta = re.search(META_PATTERN, html_content)
+    if match_meta:
+        return float(match_meta.group(1)), float(match_meta.group(2)), "meta"
+    return None
+
+def normalize_url(url):
+    """ Cache key: lower-case scheme/host, no fragment, no trailing slash, sorted query without tracking params """
+    parts = urlsplit(url.strip())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not k.startswith(TRACKING_PARAMS))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/') or '/', urlencode(query), ''))
+
+def open_cache(path=CACHE_DB):
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS coords ("
+        "url TEXT PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL, method TEXT NOT NULL, resolved_at REAL NOT NULL)"
+    )
+    return db
+
+def cached_coords(db, ttl_days=CACHE_TTL_DAYS):
+    """ normalized URL -> (lat, lon, method) for every entry younger than the TTL """
+    cutoff = time.time() - ttl_days * 86400
+    rows = db.execute("SELECT url, lat, lon, method FROM coords WHERE resolved_at >= ?", (cutoff,))
+    return {url: (lat, lon, method) for url, lat, lon, method in rows}
+
+def store_coords(db, url, coords):
+    db.execute(
+        "INSERT OR REPLACE INTO coords (url, lat, lon, method, resolved_at) VALUES (?, ?, ?, ?, ?)",
+        (normalize_url(url), coords[0], coords[1], coords[2], time.time())
+    )
+    db.commit()
+
+def fetch_page(session, url, bucket, retries=MAX_RETRIES, backoff=BACKOFF_SECONDS, timeout=TIMEOUT,
+               max_backoff=MAX_BACKOFF_SECONDS):
+    """ GET through the rate limiter, retrying connection errors and RETRY_STATUS with capped exponential backoff """
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        try:
+            response = session.get(url, timeout=timeout)
+            if response.status_code not in RETRY_STATUS:
+                return response.text
+            retry_after = response.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else backoff * 2 ** attempt
+            error = f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            delay = backoff * 2 ** attempt
+            error = e
+        if attempt == retries:
+            raise RuntimeError(f"{error} (gave up after {retries + 1} attempts)")
+        time.sleep(min(delay, max_backoff) + random.uniform(0, backoff / 2))
+
+def resolve_item(item, session, bucket):
+    """ Worker: (ID, URL, (lat, lon, method) or None, error message or None) """
+    current_id, url = item
+    try:
+        return current_id, url, coords_from_html(fetch_page(session, url, bucket)), None
+    except Exception as e:
+        return current_id, url, None, str(e)
+
+def report(current_id, coords, error, cached=False):
+    if error:
+        print(f"❌ ID {current_id}: Network Error {error}")
+    elif coords is None:
+        print(f"❌ ID {current_id}: No coords found. (Cookie might be expired?)")
+    else:
+        label = {"direct": "Direct", "html": "Found in HTML", "meta": "Found in Meta"}[coords[2]]
+        print(f"✅ ID {current_id}: {label}{' (cached)' if cached else ''} -> {coords[0]}, {coords[1]}")
+
+def resolve_urls(items, headers=HEADERS, output_name=OUTPUT_FILE, workers=MAX_WORKERS,
+                 rate=RATE_PER_SECOND, burst=BURST, cache_path=CACHE_DB, ttl_days=CACHE_TTL_DAYS):
+    """
+    Resolves (ID, URL) items, downloading Place pages on `workers` threads through one pooled session
+    and a token bucket; URLs resolved within `ttl_days` come from the SQLite cache at `cache_path`
+    (None disables it). Rows are appended to `output_name` as they arrive, then sorted by ID at the end;
+    the file is only created once something resolves. Returns the number of resolved items.
+    """
+    db = open_cache(cache_path) if cache_path else None
+    known = cached_coords(db, ttl_days) if db else {}
+    fields = ["ID", "Latitude", "Longitude"]
+    resolved = 0
+    out = writer = None
+    try:
+        def save(current_id, coords, error, cached=False):
+            nonlocal resolved, out, writer
+            report(current_id, coords, error, cached)
+            if coords is None: return
+            if writer is None:
+                out = open(output_name, "w", newline="", encoding="utf-8")
+                writer = csv.DictWriter(out, fieldnames=fields)
+                writer.writeheader()
+            writer.writerow({"ID": current_id, "Latitude": coords[0], "Longitude": coords[1]})
+            out.flush()
+            resolved += 1
+
+        pending = []
+        for current_id, url in items:
+            coords = coords_from_url(url)
+            if coords: save(current_id, coords, None)
+            elif normalize_url(url) in known: save(current_id, known[normalize_url(url)], None, cached=True)
+            else: pending.append((current_id, url))
+
+        if pending:
+            print(f"🌐 Downloading {len(pending)} Place pages ({len(items) - len(pending)} resolved without network)...")
+            bucket = TokenBucket(rate, burst)
+            with make_session(headers, workers) as session, ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(resolve_item, item, session, bucket) for item in pending]
+                for future in as_completed(futures):
+                    current_id, url, coords, error = future.result()
+                    if db and coords: store_coords(db, url, coords)
+                    save(current_id, coords, error)
+    finally:
+        if out: out.close()
+        if db: db.close()
+
+    if resolved:
+        df = pd.read_csv(output_name).sort_values(by="ID")
+        df.to_csv(output_name, index=False)
+    return resolved
+
 def resolve_locations():
     print("--- Google Maps Location Resolver ---")
-    
+
     # 1. Get Input File
     input_file = input("Enter the filename (e.g., map_urls.txt): ").strip().replace('"', '')
     if not os.path.exists(input_file):
@@ -26,83 +234,21 @@ def resolve_locations():
     print("\n[Optional] Paste your Google Maps Cookie to resolve 'Place' links.")
     print("If you skip this, some links might fail.")
     my_cookie = input("Cookie (Press Enter to skip): ").strip()
-    
-    if my_cookie:
-        HEADERS["Cookie"] = my_cookie
 
-    data = []
+    headers = dict(HEADERS)
+    if my_cookie:
+        headers["Cookie"] = my_cookie
 
     print(f"\nReading {input_file}...")
     with open(input_file, "r", encoding="utf-8") as f:
         lines = f.readlines()
 
-    print(f"Processing {len(lines)} items...")
-    print("This may take a few minutes...")
-
-    for i, line in enumerate(lines):
-        if not line.strip(): continue
-
-        # Calculate ID (assuming reverse order 186 -> 1, optional logic)
-        current_id = len(lines) - i 
-        
-        # Extract URL
-        url_match = re.search(r'(https?://[^\s]+)', line)
-        if not url_match: continue
-        url = url_match.group(1)
-
-        lat, lon = None, None
-
-        # --- METHOD A: Direct Search URL (Fast) ---
-        match_search = re.search(r'search/(\d+\.\d+),(\d+\.\d+)', url)
-        if match_search:
-            lat = float(match_search.group(1))
-            lon = float(match_search.group(2))
-            print(f"✅ ID {current_id}: Direct -> {lat}, {lon}")
-
-        # --- METHOD B: Place URL (Download Content) ---
-        else:
-            try:
-                # Download the page content
-                response = requests.get(url, headers=HEADERS, timeout=10)
-                html_content = response.text
-                
-                # 1. Try to find the "center" of the view in HTML
-                match_content = re.search(r'\[\s*(4[12]\.\d+)\s*,\s*(2[234]\.\d+)\s*\]', html_content)
-                
-                if match_content:
-                    lat = float(match_content.group(1))
-                    lon = float(match_content.group(2))
-                    print(f"✅ ID {current_id}: Found in HTML -> {lat}, {lon}")
-                else:
-                    # 2. Try to find the URL inside the HTML meta tags
-                    match_meta = re.search(r'content=".*?center=(\d+\.\d+)%2C(\d+\.\d+)', html_content)
-                    if match_meta:
-                        lat = float(match_meta.group(1))
-                        lon = float(match_meta.group(2))
-                        print(f"✅ ID {current_id}: Found in Meta -> {lat}, {lon}")
-                    else:
-                        print(f"❌ ID {current_id}: No coords found. (Cookie might be expired?)")
-
-                time.sleep(0.5) # Wait to be polite
-                
-            except Exception as e:
-                print(f"❌ ID {current_id}: Network Error {e}")
-
-        # Save
-        if lat and lon:
-            data.append({
-                "ID": current_id,
-                "Latitude": lat,
-                "Longitude": lon
-            })
+    items = read_url_items(lines)
+    print(f"Processing {len(items)} items ({MAX_WORKERS} connections, ≤{RATE_PER_SECOND:g} requests/s)...")
 
     # --- SAVE ---
-    if data:
-        df = pd.DataFrame(data)
-        df = df.sort_values(by="ID")
-        output_name = "resolved_coordinates.csv"
-        df.to_csv(output_name, index=False)
-        print(f"\n🎉 SUCCESS! Saved to '{output_name}'")
+    if resolve_urls(items, headers):
+        print(f"\n🎉 SUCCESS! Saved to '{OUTPUT_FILE}'")
     else:
         print("No data extracted.")
 
@@ -0,0 +1,185 @@
+import os
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import platform
+import contextlib
+import importlib.util
+import numpy as np
+import pandas as pd
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+# ==========================================
+# PIPELINE INSTRUMENTATION
+# ==========================================
+# A RunStats records one pipeline run as named stages: wall time, rows in / out and the main process' peak
+# RSS (reset per stage on Linux, the process-wide peak so far elsewhere). Entering a stage name again
+# (e.g. charts submitted before the report and awaited after it) adds to the same record. With a profiler,
+# every stage is profiled separately and written to <profile_dir>/<stage>.prof/.txt (cProfile) or .html.
+PROFILERS = ('cprofile', 'pyinstrument')
+PROFILE_TOP = 30  # functions listed in the cProfile text summary
+CLEAR_REFS = '/proc/self/clear_refs'  # Linux: writing '5' resets the peak-RSS counter
+
+def reset_peak_rss():
+    """ Restarts the kernel's peak-RSS counter (VmHWM); False where that is not supported """
+    if not os.path.exists(CLEAR_REFS): return False
+    try:
+        with open(CLEAR_REFS, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def rss_mib(field='VmRSS'):
+    """
+    Current (VmRSS) or peak (VmHWM) resident set in MiB; falls back to getrusage's lifetime peak, and to
+    None where neither is available (Windows)
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+def children_peak_mib():
+    """ Largest peak RSS of any finished worker process (ingest / chart pools); None without `resource` """
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+def round_mib(mib):
+    return None if mib is None else round(mib, 1)
+
+def pyinstrument_available():
+    return importlib.util.find_spec('pyinstrument') is not None
+
+def environment():
+    return {
+        'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+        'machine': platform.machine(), 'cpus': os.cpu_count()
+    }
+
+class RunStats:
+    """ Stage records of one run; `profiler` is None, 'cprofile' or 'pyinstrument' """
+    def __init__(self, profiler=None, profile_dir="profiles"):
+        if profiler == 'pyinstrument' and not pyinstrument_available():
+            print("⚠️ pyinstrument is not installed, profiling with cProfile instead.")
+            profiler = 'cprofile'
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.stages = {}
+        self.profiles = {}
+
+    def _profile_start(self, name):
+        if self.profiler is None: return None
+        prof = self.profiles.get(name)
+        if prof is None:
+            if self.profiler == 'pyinstrument':
+                from pyinstrument import Profiler
+                prof = Profiler()
+            else:
+                prof = cProfile.Profile()
+            self.profiles[name] = prof
+        if self.profiler == 'pyinstrument':
+            prof.start()
+        else:
+            prof.enable()
+        return prof
+
+    def _profile_stop(self, prof):
+        if prof is None: return
+        if self.profiler == 'pyinstrument':
+            prof.stop()
+        else:
+            prof.disable()
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        """ Times the block; the yielded dict takes 'rows_out' and any extra counters """
+        record = self.stages.setdefault(name, {'seconds': 0.0, 'rows_in': None, 'rows_out': None, 'peak_rss_mib': None})
+        if rows_in is not None: record['rows_in'] = int(rows_in)
+        reset_peak_rss()
+        record.setdefault('start_rss_mib', round_mib(rss_mib()))
+        prof = self._profile_start(name)
+        t0 = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = round(record['seconds'] + time.perf_counter() - t0, 4)
+            self._profile_stop(prof)
+            peak = rss_mib('VmHWM')
+            if peak is not None:
+                record['peak_rss_mib'] = round(max(record['peak_rss_mib'] or 0.0, peak), 1)
+            if record['rows_out'] is not None: record['rows_out'] = int(record['rows_out'])
+
+    def write_profiles(self):
+        """ One profile per stage under profile_dir; returns {stage: path} """
+        if not self.profiles: return {}
+        os.makedirs(self.profile_dir, exist_ok=True)
+        paths = {}
+        for name, prof in self.profiles.items():
+            base = os.path.join(self.profile_dir, name)
+            if self.profiler == 'pyinstrument':
+                with open(base + ".html", 'w', encoding='utf-8') as f:
+                    f.write(prof.output_html())
+                paths[name] = base + ".html"
+                continue
+            prof.dump_stats(base + ".prof")
+            text = io.StringIO()
+            pstats.Stats(prof, stream=text).sort_stats('cumulative').print_stats(PROFILE_TOP)
+            with open(base + ".txt", 'w', encoding='utf-8') as f:
+                f.write(text.getvalue())
+            paths[name] = base + ".prof"
+        return paths
+
+    def summary(self, **extra):
+        stages = [{'name': name, **record} for name, record in self.stages.items()]
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'total_seconds': round(time.perf_counter() - self.t0, 4),
+            'peak_rss_mib': max((s['peak_rss_mib'] for s in stages if s['peak_rss_mib'] is not None),
+                                default=round_mib(rss_mib('VmHWM'))),
+            'workers_peak_rss_mib': round_mib(children_peak_mib()),
+            'profiler': self.profiler,
+            'environment': environment(),
+            **extra,
+            'stages': stages
+        }
+
+    def write(self, path, **extra):
+        """ Writes the JSON run summary (and the stage profiles) and prints the stage table """
+        profiles = self.write_profiles()
+        for name, profile_path in profiles.items():
+            self.stages[name]['profile'] = profile_path
+        summary = self.summary(**extra)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=1)
+
+        print("\n⏱️ STAGE TIMINGS")
+        for s in summary['stages']:
+            rows = f"{s['rows_in']:,} -> " if s['rows_in'] is not None else ""
+            rows += f"{s['rows_out']:,} rows" if s['rows_out'] is not None else ""
+            peak = f"{s['peak_rss_mib']:>7.0f} MiB peak" if s['peak_rss_mib'] is not None else "   peak RSS n/a"
+            print(f"  {s['name']:<18} {s['seconds']:>9.2f} s  {peak}  {rows}")
+        print(f"📄 Run summary saved to: {path}")
+        return summary
+
+def stage(stats, name, rows_in=None):
+    """ stats.stage(...) when instrumenting, otherwise a no-op block that still yields a record dict """
+    if stats is None:
+        return contextlib.nullcontext({})
+    return stats.stage(name, rows_in)
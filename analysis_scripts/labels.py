@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# OPERATOR / TECH LABELS
+# ==========================================
+# Raw SPN and network type strings -> the labels every script groups by. Shared by network_analyzer and
+# device_comparison, so both merge the same promotional name variants and drop the same junk labels.
+
+# 🏷️ LABEL ALIASES (first match wins, checked against the upper-cased raw name)
+OPERATOR_ALIASES = [
+    ("YETTEL", "YETTEL"),
+    ("A1", "A1"),
+    ("VIVA", "VIVACOM"),
+    ("TURK", "TURK TELEKOM"),
+    ("VODA", "VODAFONE"),
+    ("AVEA", "TURK TELEKOM"),
+]
+TECH_ALIASES = [
+    (("NR",), "5G"),
+    (("LTE",), "4G"),
+    (("WCDMA", "HSPA", "UMTS", "3G"), "3G"),
+    (("GSM", "EDGE", "GPRS", "2G"), "2G"),
+]
+
+# 🚫 BLOCK LIST (Junk Data)
+INVALID_LABELS = [
+    'NO SERVICE', 'EMERGENCY ONLY', 'EMERGENCY CALLS ONLY', 
+    'UNKNOWN', 'SEARCHING', 'NO CONNECTION', 'NOT LOGGED', 'NAN'
+]
+
+def smart_merge_names(op_raw):
+    if pd.isna(op_raw): return "UNKNOWN"
+    op = str(op_raw).upper().strip()
+    
+    for keyword, label in OPERATOR_ALIASES:
+        if keyword in op: return label
+    
+    if "|" in op:
+        op = op.split('|')[0].strip()
+    return op
+
+def standardize_tech(raw_tech):
+    if pd.isna(raw_tech): return "UNKNOWN"
+    t = str(raw_tech).upper()
+    
+    for keywords, label in TECH_ALIASES:
+        if any(k in t for k in keywords): return label
+    
+    return "Other"
+
+def normalize_labels(series, mapper):
+    """ Runs `mapper` once per distinct raw value and broadcasts the result as a categorical via factorize codes """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    lookup = np.array([mapper(u) for u in uniques] + [mapper(np.nan)], dtype=object)
+    labels, label_codes = np.unique(lookup, return_inverse=True)
+    # NaN rows get code -1, which indexes the trailing mapper(NaN) entry
+    return pd.Series(pd.Categorical.from_codes(label_codes[codes], labels), index=series.index)
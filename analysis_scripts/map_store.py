@@ -0,0 +1,54 @@
+import os
+import shutil
+import importlib.util
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# COLUMNAR SIGNAL MAP STORE
+# ==========================================
+# One Parquet dataset holding every signal_map table, hive-partitioned as
+#   signal_maps.parquet/operator=<OP>/tech=<TECH>/*.parquet
+# Combined (all-tech) maps live under tech=ALL_COMBINED, mirroring the CSV file names.
+DATASET_NAME = "signal_maps.parquet"
+COMBINED_TECH = "ALL_COMBINED"
+PARTITION_COLS = ['operator', 'tech']
+FLOAT32_COLS = ['rsrp', 'snr', 'rsrq', 'pci_2nd_share']
+COMPRESSION = 'zstd'
+
+def pyarrow_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+def _compact(df):
+    """ float32 metrics and the narrowest nullable int that holds every PCI (GSM CIDs can exceed int16) """
+    df = df.astype({c: 'float32' for c in FLOAT32_COLS if c in df.columns})
+    if 'pci' in df.columns:
+        pci = pd.to_numeric(df['pci'], errors='coerce')
+        fits16 = pci.dropna().between(np.iinfo(np.int16).min, np.iinfo(np.int16).max).all()
+        df['pci'] = pci.astype('Int16' if fits16 else 'Int32')
+    return df
+
+def write_signal_maps(df_map_split, df_map_combined, export_dir):
+    """ Replaces <export_dir>/signal_maps.parquet with the split + combined map tables; returns its path """
+    path = os.path.join(export_dir, DATASET_NAME)
+    combined = df_map_combined.assign(tech=COMBINED_TECH)
+    table = _compact(pd.concat([df_map_split, combined[df_map_split.columns]], ignore_index=True))
+
+    # Partitioned writes add files next to existing ones, so start from an empty directory
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    table.to_parquet(path, engine='pyarrow', partition_cols=PARTITION_COLS, compression=COMPRESSION, index=False)
+    return path
+
+def load_signal_maps(path, operators=None, techs=None, columns=None):
+    """
+    Reads back only the requested partitions and columns.
+    e.g. load_signal_maps("exported_results/signal_maps.parquet", operators=["A1"], techs=["4G"], columns=["lat", "lon", "rsrp"])
+    Pass techs=["ALL_COMBINED"] for the combined maps. operator/tech come back as categoricals.
+    """
+    filters = []
+    if operators is not None:
+        filters.append(('operator', 'in', list(operators)))
+    if techs is not None:
+        filters.append(('tech', 'in', list(techs)))
+    return pd.read_parquet(path, engine='pyarrow', columns=columns, filters=filters or None)
@@ -1,6 +1,16 @@
 import os
+import glob
+import json
+import math
 import time
+import zlib
+import struct
+import shutil
+import asyncio
+import argparse
+from PIL import Image
 from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
 
 # Window Size (Keep small for speed)
 NAV_WIDTH = 1200
@@ -9,6 +19,120 @@ NAV_HEIGHT = 900
 # Quality Boost (3 = 4K resolution on small screen)
 PIXEL_RATIO = 3 
 
+# 🎬 BATCH MODE (--manifest): one headless browser, several maps rendering at once
+BATCH_PAGES = 3  # pages (maps) rendered concurrently
+BATCH_OUT_DIR = "renders"
+RENDER_TIMEOUT_S = 120  # give up waiting for the map to settle after this long
+RENDER_QUIET_MS = 1000  # map idle and no new network responses for this long = render complete
+
+# 🧩 TILED MODE (--tiles / manifest "tiles"): poster-size images beyond what one viewport can hold.
+# The camera steps over a cols x rows grid of viewports (web-mercator, north up, no tilt) around the preset,
+# each tile is captured at a moderate scale and the tiles are stitched one strip at a time.
+TILE_SCALE = 2  # device scale factor per tile
+TILE_MARGIN_PX = 64  # extra viewport around every tile, cropped away (labels and dots cut at the edge redraw whole)
+MERCATOR_TILE_PX = 512  # world width at zoom 0 in CSS pixels (mapbox-gl / Kepler.gl convention)
+PNG_STRIP_LEVEL = 6  # zlib level of the stitched PNG
+
+# Chromium flags: GPU-backed GL for the interactive window, SwiftShader (CPU) WebGL for headless hosts
+DESKTOP_GL_ARGS = ['--use-gl=desktop', '--enable-webgl', '--ignore-gpu-blocklist']
+SOFTWARE_GL_ARGS = ['--use-angle=swiftshader', '--enable-unsafe-swiftshader', '--enable-webgl', '--ignore-gpu-blocklist']
+
+# UI elements commonly found in Kepler.gl exports
+HIDE_UI_CSS = """
+    .side-panel, .map-control, .bottom-widget, .mapboxgl-ctrl
+    { display: none !important; }
+"""
+
+# Runs before the page's own scripts: keeps every mapbox-gl / maplibre-gl map the page creates in
+# window.__renderMaps (so we can ask it whether it is idle) and lifts the resource timing buffer limit.
+RENDER_HOOK_JS = """
+(() => {
+    performance.setResourceTimingBufferSize(100000);
+    window.__renderMaps = [];
+    for (const name of ['mapboxgl', 'maplibregl']) {
+        let lib;
+        Object.defineProperty(window, name, {
+            configurable: true,
+            get() { return lib; },
+            set(value) {
+                lib = value;
+                if (!value || !value.Map || value.Map.__renderHooked) return;
+                const Base = value.Map;
+                const Hooked = function (...args) {
+                    const map = new Base(...args);
+                    window.__renderMaps.push(map);
+                    return map;
+                };
+                Hooked.prototype = Base.prototype;
+                Object.setPrototypeOf(Hooked, Base);
+                Hooked.__renderHooked = true;
+                try { value.Map = Hooked; } catch (e) { /* frozen module namespace */ }
+            }
+        });
+    }
+})();
+"""
+
+# Resolves once every hooked map is loaded, has its tiles and is not moving, and no network response
+# arrived for `quietMs`; checked every two animation frames so deck.gl layers have drawn too.
+WAIT_FOR_RENDER_JS = """
+async ({quietMs, timeoutMs}) => {
+    const start = performance.now();
+    const frames = n => new Promise(done => {
+        const step = k => k ? requestAnimationFrame(() => step(k - 1)) : done();
+        step(n);
+    });
+    const maps = window.__renderMaps || [];
+    const mapsIdle = () => maps.every(m => m.loaded() && m.areTilesLoaded() && !m.isMoving());
+    let seen = -1, quietSince = performance.now();
+    while (performance.now() - start < timeoutMs) {
+        await frames(2);
+        const responses = performance.getEntriesByType('resource').length;
+        if (responses !== seen || document.readyState !== 'complete' || !mapsIdle()) {
+            seen = responses;
+            quietSince = performance.now();
+        } else if (performance.now() - quietSince >= quietMs) {
+            return {idle: true, seconds: (performance.now() - start) / 1000, maps: maps.length};
+        }
+    }
+    return {idle: false, seconds: (performance.now() - start) / 1000, maps: maps.length};
+}
+"""
+
+# Moves the camera of a Kepler.gl HTML export through its Redux store (the export's `store` and `KeplerGl` globals)
+SET_CAMERA_JS = """
+camera => {
+    if (typeof store === 'undefined' || typeof KeplerGl === 'undefined') return false;
+    store.dispatch(KeplerGl.updateMap(camera));
+    return true;
+}
+"""
+CAMERA_KEYS = ('latitude', 'longitude', 'zoom', 'pitch', 'bearing')
+
+# Camera of the first Kepler.gl instance in the export, or null
+GET_CAMERA_JS = """
+() => {
+    if (typeof store === 'undefined') return null;
+    const instance = Object.values(store.getState().keplerGl || {})[0];
+    if (!instance || !instance.mapState) return null;
+    const {latitude, longitude, zoom} = instance.mapState;
+    return {latitude, longitude, zoom};
+}
+"""
+
+def wait_for_render(page, timeout_s=RENDER_TIMEOUT_S, quiet_ms=RENDER_QUIET_MS):
+    """ Blocks until the map reports it has finished drawing (see WAIT_FOR_RENDER_JS); returns its verdict """
+    return page.evaluate(WAIT_FOR_RENDER_JS, {'quietMs': quiet_ms, 'timeoutMs': timeout_s * 1000})
+
+def render_notes(state):
+    """ Warnings for a WAIT_FOR_RENDER_JS verdict: timed out, or no map hooked so only the network was watched """
+    notes = []
+    if not state['maps']:
+        notes.append("no mapbox-gl/maplibre-gl map found, waited for network quiet only")
+    if not state['idle']:
+        notes.append(f"still busy after {state['seconds']:.0f} s")
+    return notes
+
 def render():
     print("--- Kepler.gl High-Res Screenshot Tool ---")
     html_file = input("Enter the HTML map filename (e.g. map.html): ").strip().replace('"', '')
@@ -25,18 +149,14 @@ def render():
     with sync_playwright() as p:
         browser = p.chromium.launch(
             headless=False,
-            args=[
-                '--use-gl=desktop',
-                '--enable-webgl',
-                '--ignore-gpu-blocklist',
-                f'--window-size={NAV_WIDTH},{NAV_HEIGHT}'
-            ]
+            args=DESKTOP_GL_ARGS + [f'--window-size={NAV_WIDTH},{NAV_HEIGHT}']
         )
         
         context = browser.new_context(
             viewport={'width': NAV_WIDTH, 'height': NAV_HEIGHT},
             device_scale_factor=1
         )
+        context.add_init_script(RENDER_HOOK_JS)
         page = context.new_page()
         
         print(f"📂 Opening map...")
@@ -68,8 +188,10 @@ def render():
             "mobile": False
         })
         
-        print("⏳ Waiting 15 seconds for WebGL to re-render...")
-        time.sleep(15)
+        print("⏳ Waiting for WebGL to re-render...")
+        state = wait_for_render(page)
+        for note in render_notes(state):
+            print(f"⚠️ {note}")
         
         # -------------------------------------------------
         # PHASE 3: VISUAL CHECK
@@ -85,10 +207,7 @@ def render():
 
         # Hide UI elements commonly found in Kepler.gl exports
         print("🧹 Cleaning UI...")
-        page.add_style_tag(content="""
-            .side-panel, .map-control, .bottom-widget, .mapboxgl-ctrl 
-            { display: none !important; }
-        """)
+        page.add_style_tag(content=HIDE_UI_CSS)
         
         # Capture
         print(f"📸 Snapping Screenshot to {output_image}...")
@@ -97,5 +216,300 @@ def render():
         browser.close()
         print(f"✅ DONE! Saved.")
 
+# ==========================================
+# HEADLESS BATCH MODE
+# ==========================================
+def load_render_manifest(path):
+    """
+    JSON manifest, paths relative to the manifest file:
+      {"maps": ["maps/*.html"],
+       "presets": {"center": {"latitude": 42.69, "longitude": 23.32, "zoom": 13, "pitch": 40, "bearing": 15}},
+       "out_dir": "renders", "scale": 3, "width": 1200, "height": 900,
+       "tiles": {"cols": 4, "rows": 3, "scale": 2, "keep_tiles": false}}
+    Without "presets" every map is rendered once at the view saved in its HTML. With "tiles" every
+    preset becomes a cols x rows poster of width x height tiles (see render_tiled).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    maps = []
+    for pattern in manifest['maps']:
+        matches = sorted(glob.glob(os.path.join(base, pattern))) or [os.path.join(base, pattern)]
+        maps += [m for m in matches if m not in maps]
+
+    presets = {name: {k: v for k, v in camera.items() if k in CAMERA_KEYS}
+               for name, camera in (manifest.get('presets') or {'view': {}}).items()}
+    settings = {
+        'out_dir': os.path.join(base, manifest.get('out_dir', BATCH_OUT_DIR)),
+        'scale': manifest.get('scale', PIXEL_RATIO),
+        'width': manifest.get('width', NAV_WIDTH),
+        'height': manifest.get('height', NAV_HEIGHT),
+        'tiles': manifest.get('tiles')
+    }
+    return maps, presets, settings
+
+def output_path(out_dir, html_file, preset):
+    stem = os.path.splitext(os.path.basename(html_file))[0]
+    return os.path.join(out_dir, f"{stem}_{preset}.png")
+
+def clear_output(path):
+    """ Drops an image left by an earlier run, so an existing output always means this run captured it """
+    if os.path.exists(path):
+        os.remove(path)
+
+async def open_map_page(browser, html_file, width, height, scale):
+    """ New context + page with the render hook installed, the map loaded and the Kepler UI hidden """
+    context = await browser.new_context(viewport={'width': width, 'height': height}, device_scale_factor=scale)
+    try:
+        await context.add_init_script(RENDER_HOOK_JS)
+        page = await context.new_page()
+        await page.goto(f"file://{os.path.abspath(html_file)}", wait_until='load')
+        await page.add_style_tag(content=HIDE_UI_CSS)
+    except Exception:
+        await context.close()
+        raise
+    return context, page
+
+async def render_map(browser, html_file, presets, settings, slots):
+    """ Opens one map in its own context and captures every preset; returns [(path, error or None)] """
+    async with slots:
+        paths = {name: output_path(settings['out_dir'], html_file, name) for name in presets}
+        for path in paths.values():
+            clear_output(path)
+        if not os.path.exists(html_file):
+            return [(path, "file not found") for path in paths.values()]
+        try:
+            context, page = await open_map_page(browser, html_file, settings['width'], settings['height'], settings['scale'])
+        except Exception as e:
+            return [(path, f"{type(e).__name__}: {e}") for path in paths.values()]
+
+        results = []
+        try:
+            wait_args = {'quietMs': RENDER_QUIET_MS, 'timeoutMs': RENDER_TIMEOUT_S * 1000}
+
+            for name, camera in presets.items():
+                path = paths[name]
+                try:
+                    if camera and not await page.evaluate(SET_CAMERA_JS, camera):
+                        raise RuntimeError("camera presets need a Kepler.gl HTML export (no store/KeplerGl globals)")
+                    state = await page.evaluate(WAIT_FOR_RENDER_JS, wait_args)
+                    await page.screenshot(path=path)
+                    results.append((path, "; ".join(render_notes(state)) or None))
+                except Exception as e:
+                    results.append((path, f"{type(e).__name__}: {e}"))
+        finally:
+            await context.close()
+        return results
+
+async def render_batch_async(maps, presets, settings, pages=BATCH_PAGES, gl_args=SOFTWARE_GL_ARGS):
+    os.makedirs(settings['out_dir'], exist_ok=True)
+    slots = asyncio.Semaphore(max(pages, 1))
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=gl_args)
+        try:
+            if settings.get('tiles'):
+                tasks = [render_tiled_batch(browser, maps, presets, settings, pages)]
+            else:
+                tasks = [render_map(browser, m, presets, settings, slots) for m in maps]
+            done = []
+            for future in asyncio.as_completed(tasks):
+                # Outputs are cleared before capturing, so an existing file was written by this run
+                for path, error in await future:
+                    status = "✅" if error is None else ("⚠️" if os.path.exists(path) else "❌")
+                    print(f"{status} {path}" + (f" ({error})" if error else ""))
+                    done.append((path, error))
+            return done
+        finally:
+            await browser.close()
+
+def render_batch(manifest_path, pages=BATCH_PAGES, software_gl=True, tiles=None):
+    """
+    Renders every map x preset of a manifest without prompts; `tiles` = (cols, rows) overrides the
+    manifest's tile grid. Returns [(path, error or None)]
+    """
+    maps, presets, settings = load_render_manifest(manifest_path)
+    if tiles:
+        settings['tiles'] = {**(settings['tiles'] or {}), 'cols': tiles[0], 'rows': tiles[1]}
+    if settings['tiles']:
+        grid = {'cols': 2, 'rows': 2, 'scale': TILE_SCALE, **settings['tiles']}
+        mode = f"as {grid['cols']}x{grid['rows']} tiles at {grid['scale']}x"
+    else:
+        mode = f"at {settings['scale']}x"
+    print(f"🎬 Rendering {len(maps)} map(s) x {len(presets)} preset(s) {mode} "
+          f"({pages} pages at a time, {'software' if software_gl else 'GPU'} WebGL)...")
+    t0 = time.perf_counter()
+    results = asyncio.run(render_batch_async(maps, presets, settings, pages,
+                                             SOFTWARE_GL_ARGS if software_gl else DESKTOP_GL_ARGS))
+    failed = sum(not os.path.exists(path) for path, _ in results)
+    print(f"\n🎉 {len(results) - failed}/{len(results)} images in {time.perf_counter() - t0:.0f} s -> '{settings['out_dir']}'")
+    return results
+
+# ==========================================
+# TILED POSTERS
+# ==========================================
+def mercator_px(latitude, longitude, zoom):
+    """ World pixel (x, y) of a point at `zoom`, origin at the top-left of the web-mercator square """
+    world = MERCATOR_TILE_PX * 2 ** zoom
+    lat = math.radians(max(min(latitude, 85.0511), -85.0511))
+    return (longitude + 180) / 360 * world, (1 - math.asinh(math.tan(lat)) / math.pi) / 2 * world
+
+def mercator_latlon(x, y, zoom):
+    world = MERCATOR_TILE_PX * 2 ** zoom
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / world)))), x / world * 360 - 180
+
+def tile_cameras(camera, cols, rows, width, height):
+    """ [(row, col, camera)]: the grid of width x height viewports centred on `camera`, north up and flat """
+    cx, cy = mercator_px(camera['latitude'], camera['longitude'], camera['zoom'])
+    tiles = []
+    for row in range(rows):
+        for col in range(cols):
+            lat, lon = mercator_latlon(cx + (col - (cols - 1) / 2) * width, cy + (row - (rows - 1) / 2) * height,
+                                       camera['zoom'])
+            tiles.append((row, col, {'latitude': lat, 'longitude': lon, 'zoom': camera['zoom'], 'pitch': 0, 'bearing': 0}))
+    return tiles
+
+def png_chunk(f, kind, data):
+    f.write(struct.pack('>I', len(data)) + kind + data)
+    f.write(struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+def stitch_tiles(grid, path, level=PNG_STRIP_LEVEL):
+    """
+    Writes the tile grid (rows of tile image paths, all tiles the same size) as one RGB PNG. Only one
+    strip of tiles is decoded at a time and the pixels are streamed through zlib, so memory stays at
+    a strip even for posters far larger than RAM would hold as a single image. The PNG is written
+    next to `path` and moved into place when complete, so a failed stitch leaves no partial image.
+    """
+    with Image.open(grid[0][0]) as first:
+        tile_w, tile_h = first.size
+    width, height = tile_w * len(grid[0]), tile_h * len(grid)
+    packer = zlib.compressobj(level)
+    partial = path + ".part"
+    try:
+        with open(partial, 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n')
+            png_chunk(f, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            for tile_row in grid:
+                strip = Image.new('RGB', (width, tile_h))
+                for col, tile_path in enumerate(tile_row):
+                    with Image.open(tile_path) as tile:
+                        strip.paste(tile.convert('RGB'), (col * tile_w, 0))
+                raw = strip.tobytes()
+                stride = width * 3
+                # Filter type 0 (None) in front of every scanline
+                lines = b''.join(b'\x00' + raw[y * stride:(y + 1) * stride] for y in range(tile_h))
+                data = packer.compress(lines)
+                if data: png_chunk(f, b'IDAT', data)
+            png_chunk(f, b'IDAT', packer.flush())
+            png_chunk(f, b'IEND', b'')
+    except BaseException:
+        os.remove(partial)
+        raise
+    os.replace(partial, path)
+    return width, height
+
+async def capture_tiles(page, queue, tile_dir, tiles_cfg, wait_args):
+    """ Worker: moves its page to each queued tile camera and screenshots the inner (margin-free) area """
+    margin = TILE_MARGIN_PX
+    width, height = tiles_cfg['width'], tiles_cfg['height']
+    notes = []
+    while not queue.empty():
+        row, col, camera = queue.get_nowait()
+        await page.evaluate(SET_CAMERA_JS, camera)
+        state = await page.evaluate(WAIT_FOR_RENDER_JS, wait_args)
+        await page.screenshot(path=os.path.join(tile_dir, f"r{row:03d}_c{col:03d}.png"),
+                              clip={'x': margin, 'y': margin, 'width': width, 'height': height})
+        if not state['idle']:
+            notes.append(f"tile r{row} c{col} captured while still busy")
+        if not state['maps']:
+            notes.append(render_notes(state)[0])
+    return notes
+
+async def render_tiled(browser, html_file, name, camera, settings, pages=BATCH_PAGES):
+    """
+    One preset as a cols x rows poster: `pages` pages of the map share the tile queue, the tiles land in
+    <out_dir>/<map>_<preset>_tiles/ and are stitched into <map>_<preset>.png. Returns (path, note or None).
+    """
+    tiles_cfg = {'cols': 2, 'rows': 2, 'scale': TILE_SCALE, 'keep_tiles': False,
+                 'width': settings['width'], 'height': settings['height'], **settings['tiles']}
+    path = output_path(settings['out_dir'], html_file, name)
+    clear_output(path)
+    if not os.path.exists(html_file):
+        return path, "file not found"
+    tile_dir = os.path.splitext(path)[0] + "_tiles"
+    os.makedirs(tile_dir, exist_ok=True)
+    wait_args = {'quietMs': RENDER_QUIET_MS, 'timeoutMs': RENDER_TIMEOUT_S * 1000}
+    viewport = (tiles_cfg['width'] + 2 * TILE_MARGIN_PX, tiles_cfg['height'] + 2 * TILE_MARGIN_PX)
+
+    contexts = []
+    try:
+        context, page = await open_map_page(browser, html_file, *viewport, tiles_cfg['scale'])
+        contexts.append(context)
+        # Presets may leave out keys: the rest comes from the view saved in the export
+        await page.evaluate(WAIT_FOR_RENDER_JS, wait_args)
+        saved = await page.evaluate(GET_CAMERA_JS)
+        if saved is None:
+            return path, "tiled rendering needs a Kepler.gl HTML export (no store/KeplerGl globals)"
+        centre = {**saved, **camera}
+
+        queue = asyncio.Queue()
+        for tile in tile_cameras(centre, tiles_cfg['cols'], tiles_cfg['rows'], tiles_cfg['width'], tiles_cfg['height']):
+            queue.put_nowait(tile)
+        workers = [page]
+        for _ in range(min(pages, queue.qsize()) - 1):
+            context, extra = await open_map_page(browser, html_file, *viewport, tiles_cfg['scale'])
+            contexts.append(context)
+            workers.append(extra)
+        notes = await asyncio.gather(*(capture_tiles(w, queue, tile_dir, tiles_cfg, wait_args) for w in workers))
+    except Exception as e:
+        return path, f"{type(e).__name__}: {e}"
+    finally:
+        for context in contexts:
+            await context.close()
+
+    grid = [[os.path.join(tile_dir, f"r{row:03d}_c{col:03d}.png") for col in range(tiles_cfg['cols'])]
+            for row in range(tiles_cfg['rows'])]
+    try:
+        # Stitching is CPU-bound: keep it off the event loop
+        width, height = await asyncio.to_thread(stitch_tiles, grid, path)
+    except Exception as e:
+        return path, f"stitching failed, tiles kept in '{tile_dir}' ({type(e).__name__}: {e})"
+    if not tiles_cfg['keep_tiles']:
+        shutil.rmtree(tile_dir, ignore_errors=True)
+    print(f"🧩 {path}: {tiles_cfg['cols']}x{tiles_cfg['rows']} tiles -> {width:,} x {height:,} px")
+    # The missing-map warning repeats for every tile: report it once
+    notes = list(dict.fromkeys(n for worker_notes in notes for n in worker_notes))
+    return path, "; ".join(notes) or None
+
+async def render_tiled_batch(browser, maps, presets, settings, pages=BATCH_PAGES):
+    """ Posters one after another; each spreads its tiles over `pages` pages """
+    results = []
+    for html_file in maps:
+        for name, camera in presets.items():
+            results.append(await render_tiled(browser, html_file, name, camera, settings, pages))
+    return results
+
+def tile_grid(text):
+    """ argparse type for --tiles: 'COLSxROWS' -> (cols, rows) """
+    try:
+        cols, rows = (int(n) for n in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected COLSxROWS, e.g. 6x4, got '{text}'")
+    if cols < 1 or rows < 1:
+        raise argparse.ArgumentTypeError(f"the grid needs at least one column and one row, got '{text}'")
+    return cols, rows
+
 if __name__ == "__main__":
-    render()
+    parser = argparse.ArgumentParser(description="Kepler.gl map screenshots")
+    parser.add_argument('--manifest', help="JSON list of maps and camera presets; renders them headless, no prompts")
+    parser.add_argument('--pages', type=int, default=BATCH_PAGES, help="maps rendered at once in --manifest mode")
+    parser.add_argument('--gpu', action='store_true', help="use the GPU instead of software WebGL in --manifest mode")
+    parser.add_argument('--tiles', type=tile_grid, metavar='COLSxROWS',
+                        help="e.g. 6x4: stitch every preset from a grid of tiles (poster size)")
+    args = parser.parse_args()
+
+    if args.tiles and not args.manifest:
+        parser.error("--tiles needs --manifest")
+    if args.manifest:
+        render_batch(args.manifest, args.pages, software_gl=not args.gpu, tiles=args.tiles)
+    else:
+        render()
@@ -3,7 +3,18 @@ import numpy as np
 import glob
 import warnings
 import os
+import argparse
+import json
+import hashlib
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import matplotlib.pyplot as plt
+from spatial_index import cell_keys, cell_centers, coarsen_cells, INVALID_CELL
+from trajectory import segment, radian_columns, MAX_TRACK_SPEED
+from signal_bins import make_scheme, bin_codes, bin_table, observed_bins
+from labels import smart_merge_names, standardize_tech, normalize_labels, INVALID_LABELS
+from instrumentation import RunStats, PROFILERS, stage
+import map_store
 
 # ==========================================
 # 1. CONFIGURATION
@@ -27,30 +38,82 @@ SIGNIFICANT_TECH_RATIO = 0.05
 # 3. If average signal is worse than this, assume it's "Ghost" data
 DEAD_ZONE_THRESHOLD = -135
 
+# 📶 QUALITY BINS (signal_bins schemes: ascending edges, labels lowest bin first, thresholds read as ">= edge")
+RSRP_REPORT_BINS = make_scheme([RSRP_POOR, RSRP_GOOD, RSRP_EXCELLENT],
+                               ['4. Dead Zone', '3. Fair', '2. Good', '1. Excellent'], missing='4. Dead Zone')
+RSRP_CHART_BINS = make_scheme([-115, -100, -85], ['Poor', 'Fair', 'Good', 'Excellent'], missing='Poor')
+SNR_BINS = make_scheme([5, 13, 20], ['4. Poor', '3. Fair', '2. Good', '1. Excellent'])
+RSRQ_BINS = make_scheme([-15, -10], ['3. Poor', '2. Fair', '1. Good'])
+
+# 📥 INGESTION (schema written by SignalService.setupFile)
+SIGNAL_LOG_DTYPES = {
+    'Timestamp': 'str',
+    'Latitude': 'float64',
+    'Longitude': 'float64',
+    'Altitude': 'float64',
+    'Speed': 'float64',
+    'Operator': 'category',
+    'Slot': 'category',
+    'NetworkType': 'category',
+    'PCI': 'Int32',
+    'RSRP': 'float32',
+    'RSRQ': 'float32',
+    'SNR': 'float32'
+}
+TIMESTAMP_FORMAT = '%H:%M:%S'
+# Metric columns are parsed leniently and cast afterwards, so a malformed cell costs one value, not the file
+NUMERIC_LOG_COLUMNS = [c for c, dtype in SIGNAL_LOG_DTYPES.items() if dtype not in ('str', 'category')]
+
+# 🧮 SAMPLE SCHEMA (dtypes of the analysis frame, enforced by prepare_signal_frame after the datetime column)
+SAMPLE_DTYPES = {
+    'lat': 'float64',
+    'lon': 'float64',
+    'rsrp': 'float32',
+    'snr': 'float32',
+    'rsrq': 'float32',
+    'speed': 'float32',
+    'operator': 'category',
+    'tech': 'category',
+    'source': 'category',
+    'pci': 'Int32',  # GSM rows log the cell id (up to 65535), which does not fit int16
+    'device': 'category',
+    'slot': 'category',
+    'lat_rad': 'float64',
+    'lon_rad': 'float64',
+    'cos_lat': 'float32'
+}
+CATEGORY_COLUMNS = [c for c, dtype in SAMPLE_DTYPES.items() if dtype == 'category']
+INGEST_WORKERS = os.cpu_count() or 1
+
+# ♻️ INGEST CACHE (cleaned per-file partitions, reused while the source log is unchanged)
+USE_INGEST_CACHE = True
+INGEST_CACHE_DIR = ".ingest_cache"
+INGEST_CACHE_MANIFEST = "manifest.json"
+INGEST_CACHE_VERSION = 5  # bump when prepare_signal_frame's output changes
+
+# 🌊 STREAMING MODE (--stream)
+STREAM_CHUNK_ROWS = 500_000
+
+# 📊 CHARTS
+CHART_SETS = ('overall',)  # add 'operator' and/or 'tech' for per-operator / per-tech chart sets
+CHART_WORKERS = min(4, os.cpu_count() or 1)
+
 EXPORT_DIR = "exported_results"
+EXPORT_WORKERS = 1  # >1 writes the signal_map files on a thread pool
+MAP_ZOOM_OUT = ()  # e.g. (10, 100): extra map sets on 10x / 100x coarser grids, under <EXPORT_DIR>/zoom_x<factor>/
 CHARTS_DIR = os.path.join(EXPORT_DIR, "charts")
 
-# 🚫 BLOCK LIST (Junk Data)
-INVALID_LABELS = [
-    'NO SERVICE', 'EMERGENCY ONLY', 'EMERGENCY CALLS ONLY', 
-    'UNKNOWN', 'SEARCHING', 'NO CONNECTION', 'NOT LOGGED', 'NAN'
-]
+# ⏱️ RUN SUMMARY (per-stage timings, rows and peak memory; --profile adds a profile per stage)
+RUN_SUMMARY_FILE = os.path.join(EXPORT_DIR, "run_summary.json")
+PROFILE_DIR = os.path.join(EXPORT_DIR, "profiles")
+
+# 🏷️ Operator / tech aliases and the junk-label block list are in labels.py (shared with device_comparison)
 
 warnings.filterwarnings("ignore")
 
 # ==========================================
 # 2. HELPER FUNCTIONS
 # ==========================================
-def haversine_vectorized(lat1, lon1, lat2, lon2):
-    R = 6371.0 
-    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
-    dlon = lon2 - lon1 
-    dlat = lat2 - lat1 
-    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-    c = 2 * np.arcsin(np.sqrt(a)) 
-    km = R * c
-    return km
-
 def sanitize_metrics(df):
     if 'snr' in df.columns:
         df['snr'] = pd.to_numeric(df['snr'], errors='coerce')
@@ -65,133 +128,366 @@ def sanitize_metrics(df):
         
     return df
 
-def smart_merge_names(op_raw):
-    if pd.isna(op_raw): return "UNKNOWN"
-    op = str(op_raw).upper().strip()
-    
-    if "YETTEL" in op: return "YETTEL"
-    if "A1" in op: return "A1"
-    if "VIVA" in op: return "VIVACOM"
-    if "TURK" in op: return "TURK TELEKOM"
-    if "VODA" in op: return "VODAFONE"
-    if "AVEA" in op: return "TURK TELEKOM"
-    
-    if "|" in op:
-        op = op.split('|')[0].strip()
-    return op
+def constant_category(value, n):
+    return pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), [value])
 
-def standardize_tech(raw_tech):
-    if pd.isna(raw_tech): return "UNKNOWN"
-    t = str(raw_tech).upper()
-    
-    if "NR" in t: return "5G"
-    if "LTE" in t: return "4G"
-    if "WCDMA" in t or "HSPA" in t or "UMTS" in t or "3G" in t: return "3G"
-    if "GSM" in t or "EDGE" in t or "GPRS" in t or "2G" in t: return "2G"
-    
-    return "Other"
+def concat_samples(frames):
+    """ pd.concat that keeps the categorical columns categorical (shared, sorted categories) instead of object """
+    frames = [f for f in frames if len(f.columns)]
+    if len(frames) > 1:
+        for col in CATEGORY_COLUMNS:
+            cats = sorted(set().union(*(f[col].cat.categories for f in frames)))
+            frames = [f.assign(**{col: f[col].cat.set_categories(cats)}) for f in frames]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 
 # ==========================================
 # 3. DATA LOADING
 # ==========================================
-def load_new_format(filepath):
-    try:
-        df = pd.read_csv(filepath)
-        df['Operator'] = df['Operator'].apply(smart_merge_names)
-        df = df[~df['Operator'].isin(INVALID_LABELS)]
-        
+def sniff_header(filepath):
+    """ Reads only the header line, so non-log CSVs are skipped without a pandas parse """
+    with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+        return [c.strip() for c in f.readline().split(',')]
+
+def parse_timestamps(raw):
+    # SignalService writes a fixed HH:mm:ss stamp; fall back to inference for foreign logs
+    parsed = pd.to_datetime(raw, format=TIMESTAMP_FORMAT, errors='coerce')
+    if parsed.isna().all() and raw.notna().any():
         try:
-            df['datetime'] = pd.to_datetime(df['Timestamp'], format='mixed', errors='coerce')
+            parsed = pd.to_datetime(raw, format='mixed', errors='coerce')
         except:
-            df['datetime'] = pd.to_datetime(df['Timestamp'], errors='coerce')
-        
-        df = df.dropna(subset=['datetime', 'Operator'])
-        if 'Speed' not in df.columns: df['Speed'] = 0
-        df['Speed'] = pd.to_numeric(df['Speed'], errors='coerce')
-
-        df = df.rename(columns={
-            'Latitude': 'lat', 
-            'Longitude': 'lon', 
-            'RSRP': 'rsrp', 
-            'SNR': 'snr', 
-            'RSRQ': 'rsrq',
-            'Operator': 'operator', 
-            'PCI': 'pci', 
-            'Speed': 'speed',
-            'NetworkType': 'tech_raw'
-        })
-        
-        if 'tech_raw' in df.columns:
-            df['tech'] = df['tech_raw'].apply(standardize_tech)
-        else:
-            df['tech'] = "Unknown"
+            parsed = pd.to_datetime(raw, errors='coerce')
+    return parsed
+
+def coerce_numeric(raw):
+    """ Casts the metric columns to SIGNAL_LOG_DTYPES; unparsable cells (e.g. a truncated last line) become NaN """
+    for c in NUMERIC_LOG_COLUMNS:
+        if c not in raw.columns: continue
+        values = pd.to_numeric(raw[c], errors='coerce')
+        if SIGNAL_LOG_DTYPES[c] == 'Int32' and values.dtype.kind == 'f':
+            values = values.where((values % 1 == 0) & (values.abs() < 2**31))
+        raw[c] = values.astype(SIGNAL_LOG_DTYPES[c])
+    return raw
+
+def read_signal_csv(filepath, chunksize=None):
+    """ One log as a frame, or an iterator of frames of `chunksize` rows """
+    reader = pd.read_csv(
+        filepath,
+        usecols=lambda c: c in SIGNAL_LOG_DTYPES,
+        dtype={c: dtype for c, dtype in SIGNAL_LOG_DTYPES.items() if c not in NUMERIC_LOG_COLUMNS},
+        chunksize=chunksize
+    )
+    if chunksize is None: return coerce_numeric(reader)
+    return (coerce_numeric(chunk) for chunk in reader)
+
+def prepare_signal_frame(df, device):
+    """ Raw SignalService columns -> normalized analysis frame; `device` names the handset recording (log file) """
+    df['Operator'] = normalize_labels(df['Operator'], smart_merge_names)
+    df = df[~df['Operator'].isin(INVALID_LABELS)]
+    
+    df['datetime'] = parse_timestamps(df['Timestamp'])
+    
+    df = df.dropna(subset=['datetime', 'Operator'])
+    df['Operator'] = df['Operator'].cat.remove_unused_categories()
+    if 'Speed' not in df.columns: df['Speed'] = np.float32(0)
 
-        if 'rsrq' not in df.columns: df['rsrq'] = np.nan
-        if 'snr' not in df.columns: df['snr'] = np.nan
+    df = df.rename(columns={
+        'Latitude': 'lat', 
+        'Longitude': 'lon', 
+        'RSRP': 'rsrp', 
+        'SNR': 'snr', 
+        'RSRQ': 'rsrq',
+        'Operator': 'operator', 
+        'PCI': 'pci', 
+        'Speed': 'speed',
+        'NetworkType': 'tech_raw',
+        'Slot': 'slot'
+    })
+    
+    if 'tech_raw' in df.columns:
+        df['tech'] = normalize_labels(df['tech_raw'], standardize_tech)
+    else:
+        df['tech'] = constant_category("Unknown", len(df))
+
+    if 'rsrq' not in df.columns: df['rsrq'] = np.nan
+    if 'snr' not in df.columns: df['snr'] = np.nan
+    if 'slot' not in df.columns: df['slot'] = constant_category("", len(df))
 
-        df['source'] = 'new_auto'
-        return df[['datetime', 'lat', 'lon', 'rsrp', 'snr', 'rsrq', 'speed', 'operator', 'tech', 'source', 'pci']]
-    except Exception as e: 
-        print(f"Error reading {filepath}: {e}")
-        return pd.DataFrame()
+    df['source'] = constant_category('new_auto', len(df))
+    df['device'] = constant_category(device, len(df))
+    slot = df['slot'].astype('category')
+    df['slot'] = slot.cat.add_categories([""]).fillna("") if "" not in slot.cat.categories else slot.fillna("")
+    df['lat_rad'], df['lon_rad'], df['cos_lat'] = radian_columns(df['lat'], df['lon'])
+    return df[['datetime', *SAMPLE_DTYPES]].astype(SAMPLE_DTYPES)
+
+def log_device(filepath):
+    """ SignalService writes one file per recording, so the file name identifies the handset's track """
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+def load_new_format(filepath):
+    return prepare_signal_frame(read_signal_csv(filepath), log_device(filepath))
 
-def load_all_csvs():
+def ingest_file(filepath):
+    """ Worker entry point: returns (filepath, frame, error) so failures are reported, not swallowed """
+    try:
+        return filepath, sanitize_metrics(load_new_format(filepath)), None
+    except Exception as e:
+        return filepath, pd.DataFrame(), f"{type(e).__name__}: {e}"
+
+def find_signal_logs():
     all_files = glob.glob("*.csv")
-    df_list = []
     print(f"📂 Found {len(all_files)} CSV files.")
+    log_files, errors = [], []
     for f in all_files:
         if "signal_map" in f or "mock" in f: continue
         try:
-            preview = pd.read_csv(f, nrows=1)
-            if 'NetworkType' in preview.columns: 
-                df_list.append(load_new_format(f))
-        except: pass
+            if 'NetworkType' in sniff_header(f):
+                log_files.append(f)
+        except Exception as e:
+            errors.append((f, f"{type(e).__name__}: {e}"))
+    return log_files, errors
+
+def read_signal_logs(log_files, workers=INGEST_WORKERS):
+    """ Parses each log exactly once, fanning out across a process pool when there is more than one file """
+    if workers > 1 and len(log_files) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(log_files))) as pool:
+            return list(pool.map(ingest_file, log_files))
+    return [ingest_file(f) for f in log_files]
+
+def file_digest(filepath):
+    h = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def parquet_available():
+    return any(importlib.util.find_spec(m) is not None for m in ('pyarrow', 'fastparquet'))
+
+def load_cache_manifest(cache_dir):
+    path = os.path.join(cache_dir, INGEST_CACHE_MANIFEST)
+    if not os.path.exists(path): return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def save_cache_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, INGEST_CACHE_MANIFEST)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def read_cached_partition(path, filepath):
+    """ Partitions are keyed by content, so copies of a log share one; the device column comes from the path """
+    df = pd.read_parquet(path)
+    df['device'] = constant_category(log_device(filepath), len(df))
+    return df[['datetime', *SAMPLE_DTYPES]]
+
+def read_signal_logs_cached(log_files, workers=INGEST_WORKERS, cache_dir=INGEST_CACHE_DIR):
+    """
+    Like read_signal_logs, but serves unchanged files from Parquet partitions.
+    A file is unchanged if its size + mtime match the manifest, or failing that, its SHA-1 does.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = load_cache_manifest(cache_dir)
+    results = {}
+    to_parse, digests = [], {}
+
+    for f in log_files:
+        key = os.path.abspath(f)
+        st = os.stat(f)
+        entry = manifest.get(key)
+        if entry and entry.get('version') != INGEST_CACHE_VERSION:
+            entry = None
+        if not (entry and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime):
+            digests[f] = file_digest(f)
+            if not (entry and entry['sha1'] == digests[f]):
+                to_parse.append(f)
+                continue
+            entry.update(size=st.st_size, mtime=st.st_mtime)
+        try:
+            results[f] = (f, read_cached_partition(os.path.join(cache_dir, entry['partition']), f), None)
+        except Exception:
+            digests.setdefault(f, file_digest(f))
+            to_parse.append(f)
+
+    print(f"♻️ Ingest cache: {len(results)} reused, {len(to_parse)} new/changed.")
+    for path, df, err in read_signal_logs(to_parse, workers):
+        results[path] = (path, df, err)
+        if err: continue
+        st = os.stat(path)
+        partition = f"{digests[path]}.parquet"
+        df.drop(columns='device').to_parquet(os.path.join(cache_dir, partition), index=False)
+        manifest[os.path.abspath(path)] = {
+            'size': st.st_size, 'mtime': st.st_mtime, 'sha1': digests[path], 'partition': partition,
+            'version': INGEST_CACHE_VERSION
+        }
+
+    # Forget logs that are gone, then drop partitions no manifest entry points at any more (rewritten or deleted logs)
+    current = {os.path.abspath(f) for f in log_files}
+    manifest = {key: entry for key, entry in manifest.items() if key in current}
+    live = {e['partition'] for e in manifest.values()}
+    for name in os.listdir(cache_dir):
+        if name.endswith('.parquet') and name not in live:
+            os.remove(os.path.join(cache_dir, name))
+    save_cache_manifest(cache_dir, manifest)
+
+    return [results[f] for f in log_files]
+
+def report_ingest_errors(errors):
+    if not errors: return
+    print(f"⚠️ {len(errors)} file(s) could not be loaded:")
+    for path, err in errors:
+        print(f"  - {path}: {err}")
+
+def load_all_csvs(workers=INGEST_WORKERS, use_cache=USE_INGEST_CACHE):
+    log_files, errors = find_signal_logs()
+    
+    if use_cache and not parquet_available():
+        print("⚠️ Ingest cache disabled (install 'pyarrow' to enable it).")
+        use_cache = False
+    reader = read_signal_logs_cached if use_cache else read_signal_logs
+    
+    df_list = []
+    for path, df, err in reader(log_files, workers):
+        if err: errors.append((path, err))
+        else: df_list.append(df)
+    report_ingest_errors(errors)
         
-    if not df_list: return pd.DataFrame()
-    df_final = pd.concat(df_list, ignore_index=True)
-    return sanitize_metrics(df_final)
+    return concat_samples(df_list)
 
 # ==========================================
 # 4. FILTERING & ANALYSIS LOGIC
 # ==========================================
+PAIR_KEYS = ['operator', 'tech']
+
+STREAM_KEYS = ['device', 'slot', 'operator']
+RUN_STATE = ['run_t', 'run_lat', 'run_lon', 'run_cos']
+TRACK_STATE = RUN_STATE + ['session']
+
+def segment_tracks(df, carry=None):
+    """
+    Sorts once by (device, slot, operator, time) and attaches the trajectory columns (session, gap_s,
+    step_km, track_speed, stationary, dwell_s, handover) that the filter and the profile reuse.
+    `carry` is the last raw row per stream of the previous chunk when streaming; the new one is returned.
+    """
+    if carry is not None and len(carry):
+        df = concat_samples([carry, df])
+    df = df.sort_values(STREAM_KEYS + ['datetime'], kind='stable', ignore_index=True)
+
+    keys = df[STREAM_KEYS]
+    stream_start = (keys != keys.shift(1)).any(axis=1).to_numpy()
+    carried, next_session = None, 0
+    if carry is not None and len(carry):
+        carried = {c: df[c].to_numpy(dtype=np.float64, na_value=np.nan) for c in TRACK_STATE}
+        carried['mask'] = ~np.isnan(carried['run_t'])
+        carried['session'] = np.nan_to_num(carried['session'], nan=-1).astype(np.int64)
+        next_session = int(carry['session'].max()) + 1
+        df = df.drop(columns=TRACK_STATE)
+
+    t = df['datetime'].to_numpy(dtype='datetime64[ns]').astype(np.int64) / 1e9
+    tracks = segment(
+        stream_start, t,
+        df['lat'].to_numpy(dtype=np.float64), df['lon'].to_numpy(dtype=np.float64),
+        (df['lat_rad'].to_numpy(), df['lon_rad'].to_numpy(), df['cos_lat'].to_numpy()),
+        df['rsrp'].to_numpy(dtype=np.float64), df['pci'].to_numpy(dtype=np.float64, na_value=np.nan),
+        SESSION_TIMEOUT_SECONDS, carried, next_session, MAX_TRACK_SPEED
+    )
+    df = df.assign(**tracks)
+
+    tail = df.groupby(STREAM_KEYS, sort=False, observed=True, dropna=False).tail(1)
+    if carried is not None:
+        df = df[~carried['mask']]
+    return df.drop(columns=RUN_STATE), tail
+
 def remove_stationary_data(df):
     if df.empty: return df
+    df, _ = segment_tracks(df)
+    return df[~df['stationary']]
+
+def operator_profile(df):
+    """
+    Per-operator pollution, SNR support, handover, mobility and distance counters in one groupby over
+    the segment_tracks columns; plain sums, so chunk profiles can simply be added up. Sessions are
+    counted apart, from session_keys().
+    """
+    good = df['rsrp'] > RSRP_GOOD
+    snr = df['snr']
+    # GPS speed when the device reported one, the speed between fixes otherwise
+    speed = df['speed'].fillna(df['track_speed'])
     
-    df = df.sort_values('datetime')
-    df['lat_r'] = df['lat'].round(5) 
-    df['lon_r'] = df['lon'].round(5)
+    flags = pd.DataFrame({
+        'operator': df['operator'],
+        'samples': True,
+        'good': good,
+        'missing_snr': snr.isna(),
+        'zero_snr': snr == 0.0,
+        'polluted': good & ((bin_codes(snr, SNR_BINS) == 0) | (bin_codes(df['rsrq'], RSRQ_BINS) == 0)),
+        'vehicle': speed >= MOBILITY_THRESHOLD,
+        'switches': df['handover'],
+        # Steps never span a session break, so their gaps add up to the session durations
+        'duration_s': df['gap_s'],
+        'dwell_s': df['dwell_s'],
+        'dist_km': df['step_km']
+    })
+    return flags.groupby('operator', sort=False, observed=True).sum()
+
+def session_keys(df):
+    """ Distinct (operator, session) of a frame; session ids are unique across streams and chunks """
+    return df[['operator', 'session']].drop_duplicates()
+
+def significant_pairs(stats_df):
+    """ (operator, tech) pairs worth reporting, from a per-pair table with `count` and `avg_signal` """
+    # Determine "Dominant" tech count for each operator (usually 4G or 5G)
+    max_count = stats_df.groupby(level='operator', observed=True)['count'].transform('max')
     
-    mask = (df['lat_r'] != df['lat_r'].shift(1)) | \
-           (df['lon_r'] != df['lon_r'].shift(1)) | \
-           (df['rsrp'] != df['rsrp'].shift(1)) 
-           
-    mask.iloc[0] = True 
-    return df[mask].drop(columns=['lat_r', 'lon_r'])
-
-def calculate_true_duration(df_op):
-    df_op = df_op.sort_values('datetime')
-    df_op['diff'] = df_op['datetime'].diff().dt.total_seconds()
-    valid_duration = df_op[df_op['diff'] < SESSION_TIMEOUT_SECONDS]['diff'].sum()
-    return valid_duration / 60.0 
+    # Keep row ONLY if count > 5% of dominant tech AND count > MIN_SAMPLES
+    # AND Average Signal > DEAD_ZONE_THRESHOLD
+    # Logic: Keep if (Count > 5% of Max) OR (Count > 5000 independent of ratio)
+    # Also strictly remove if signal is garbage (-135)
+    keep = (
+        ((stats_df['count'] > max_count * SIGNIFICANT_TECH_RATIO) | (stats_df['count'] > 5000)) & 
+        (stats_df['count'] > MIN_SAMPLES_FOR_REPORT) &
+        (stats_df['avg_signal'] > DEAD_ZONE_THRESHOLD)
+    )
+    return stats_df.index[keep]
+
+def in_pairs(df, pairs):
+    return pd.MultiIndex.from_arrays([df['operator'], df['tech']]).isin(pairs)
+
+def quality_distribution(counts):
+    """ Row-normalised % table from a signal_bins count table; pairs without a single sample (e.g. no SNR on 2G/3G) are left out """
+    stats = observed_bins(counts)
+    totals = stats.sum(axis=1)
+    return stats[totals > 0].div(totals[totals > 0], axis=0) * 100
+
+def quality_distributions(df):
+    """ RSRP / SNR / RSRQ bin counts per (operator, tech), in write_report order """
+    return {
+        'rsrp': bin_table(df, PAIR_KEYS, 'rsrp', RSRP_REPORT_BINS, 'qual'),
+        'snr': bin_table(df, PAIR_KEYS, 'snr', SNR_BINS),
+        'rsrq': bin_table(df, PAIR_KEYS, 'rsrq', RSRQ_BINS)
+    }
 
 # ==========================================
 # 5. CHARTING ENGINE
 # ==========================================
-def generate_internal_charts(df_clean):
-    if df_clean.empty: return
+def chart_tables(df_clean):
+    """ The two small per-(operator, tech) tables the charts are drawn from: mean RSRP and quality bucket counts """
+    avg_rsrp = df_clean.groupby(PAIR_KEYS, observed=True)['rsrp'].mean()
+    dist = observed_bins(bin_table(df_clean, PAIR_KEYS, 'rsrp', RSRP_CHART_BINS, 'category'))
+    return avg_rsrp, dist
 
-    print("📊 Generating Visual Charts...")
-    os.makedirs(CHARTS_DIR, exist_ok=True)
-    
-    df_chart = df_clean.copy()
-    df_chart['label'] = df_chart['operator'] + " (" + df_chart['tech'] + ")"
-    
+def pair_labels(index):
+    return pd.Index([f"{op} ({tech})" for op, tech in index], name='label')
+
+def plot_signal_strength(avg_rsrp, path, title):
     plt.switch_backend('Agg')
     plt.style.use('ggplot')
 
-    # Chart 1: RSRP
     plt.figure(figsize=(12, 7))
-    avg_rsrp = df_chart.groupby('label')['rsrp'].mean().sort_values(ascending=False)
+    avg_rsrp = pd.Series(avg_rsrp.to_numpy(), index=pair_labels(avg_rsrp.index)).sort_values(ascending=False)
     
     colors = []
     for x in avg_rsrp.values:
@@ -201,22 +497,18 @@ def generate_internal_charts(df_clean):
         else: colors.append('#e74c3c') 
 
     ax = avg_rsrp.plot(kind='bar', color=colors, width=0.7)
-    plt.title('Average Signal Strength (RSRP)', fontsize=16)
+    plt.title(title, fontsize=16)
     plt.ylabel('RSRP (dBm)', fontsize=12)
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
-    plt.savefig(os.path.join(CHARTS_DIR, "benchmark_signal_strength.png"), dpi=300)
+    plt.savefig(path, dpi=300)
     plt.close()
 
-    # Chart 2: Quality
-    def classify(r):
-        if r >= -85: return 'Excellent'
-        if r >= -100: return 'Good'
-        if r >= -115: return 'Fair'
-        return 'Poor'
+def plot_quality_distribution(dist, path, title):
+    plt.switch_backend('Agg')
+    plt.style.use('ggplot')
 
-    df_chart['category'] = df_chart['rsrp'].apply(classify)
-    dist = df_chart.groupby(['label', 'category']).size().unstack(fill_value=0)
+    dist = dist.set_axis(pair_labels(dist.index), axis=0).set_axis(dist.columns.astype(str), axis=1)
     dist_pct = dist.div(dist.sum(axis=1), axis=0) * 100
     
     # Ensure correct column order
@@ -228,19 +520,70 @@ def generate_internal_charts(df_clean):
     stack_colors = [color_map[c] for c in existing_cols]
 
     ax2 = dist_pct.plot(kind='bar', stacked=True, figsize=(12, 7), color=stack_colors)
-    plt.title('Signal Quality Distribution (%)', fontsize=16)
+    plt.title(title, fontsize=16)
     plt.xticks(rotation=45, ha='right')
     plt.legend(bbox_to_anchor=(1.0, 1.05))
     plt.tight_layout()
-    plt.savefig(os.path.join(CHARTS_DIR, "benchmark_quality_dist.png"), dpi=300)
+    plt.savefig(path, dpi=300)
     plt.close()
 
+def chart_jobs(avg_rsrp, dist, chart_sets=CHART_SETS):
+    """
+    (plot function, table, output path, title) for every chart in the requested sets:
+    'overall' -> charts/, 'operator' -> charts/by_operator/ (techs of one operator), 'tech' -> charts/by_tech/
+    """
+    jobs = []
+    def add(avg_part, dist_part, folder, suffix="", subtitle=""):
+        os.makedirs(folder, exist_ok=True)
+        jobs.append((plot_signal_strength, avg_part, os.path.join(folder, f"benchmark_signal_strength{suffix}.png"),
+                     f"Average Signal Strength (RSRP){subtitle}"))
+        jobs.append((plot_quality_distribution, dist_part, os.path.join(folder, f"benchmark_quality_dist{suffix}.png"),
+                     f"Signal Quality Distribution (%){subtitle}"))
+
+    if avg_rsrp.empty: return jobs
+    if 'overall' in chart_sets:
+        add(avg_rsrp, dist, CHARTS_DIR)
+    for level in ('operator', 'tech'):
+        if level not in chart_sets: continue
+        for value in avg_rsrp.index.get_level_values(level).unique():
+            add(avg_rsrp.xs(value, level=level, drop_level=False), dist.xs(value, level=level, drop_level=False),
+                os.path.join(CHARTS_DIR, f"by_{level}"), f"_{safe_filename_part(value)}", f" - {value}")
+    return jobs
+
+def render_chart(job):
+    plot, table, path, title = job
+    plot(table, path, title)
+    return path
+
+def start_chart_rendering(jobs, workers=CHART_WORKERS):
+    """ Submits the charts to a process pool so the report is written meanwhile; returns the futures """
+    if not jobs: return []
+
+    print("📊 Generating Visual Charts...")
+    if workers > 1 and len(jobs) > 1:
+        try:
+            pool = ProcessPoolExecutor(max_workers=min(workers, len(jobs)))
+            futures = [pool.submit(render_chart, job) for job in jobs]
+            pool.shutdown(wait=False)
+            return futures
+        except (OSError, NotImplementedError) as e:
+            print(f"⚠️ Chart pool unavailable ({e}), rendering inline.")
+    for job in jobs:
+        render_chart(job)
+    return []
+
+def wait_for_charts(futures):
+    for future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"⚠️ Chart rendering failed: {e}")
+
 # ==========================================
 # 6. MAIN ANALYSIS
 # ==========================================
-def analyze_data(df):
-    if df.empty: return 0, 0
-    
+def write_report(operators, distributions, profile, scores):
+    """ Prints + saves the report from precomputed tables; shared by the in-memory and streaming paths """
     report_buffer = []
     def log(text=""):
         print(text)
@@ -251,140 +594,70 @@ def analyze_data(df):
         print(s)
         report_buffer.append(s)
 
+    def log_distribution(counts):
+        table = quality_distribution(counts)
+        if table.empty: log("  n/a (no samples)")
+        else: log_df(table)
+
     pd.set_option('display.max_columns', None)
     pd.set_option('display.width', 1000)
     pd.options.display.float_format = '{:.1f}'.format
 
-    df_new = df.copy()
-    df_new['grid_id'] = list(zip(df_new['lat'].round(GEO_PRECISION), df_new['lon'].round(GEO_PRECISION)))
-
-    # --- INTELLIGENT FILTERING FOR REPORT ---
-    # 1. Count samples per Operator + Tech
-    counts = df_new.groupby(['operator', 'tech']).size().reset_index(name='count')
-    
-    # 2. Determine "Dominant" tech count for each operator (usually 4G or 5G)
-    max_counts = counts.groupby('operator')['count'].transform('max')
-    
-    # 3. Filter: Keep row ONLY if count > 5% of dominant tech AND count > MIN_SAMPLES
-    #    AND Average Signal > DEAD_ZONE_THRESHOLD
-    means = df_new.groupby(['operator', 'tech'])['rsrp'].mean().reset_index(name='avg_signal')
-    
-    # Merge stats
-    stats_df = pd.merge(counts, means, on=['operator', 'tech'])
-    stats_df['max_count'] = stats_df.groupby('operator')['count'].transform('max')
-    
-    # Logic: Keep if (Count > 5% of Max) OR (Count > 5000 independent of ratio)
-    # Also strictly remove if signal is garbage (-135)
-    valid_rows = stats_df[
-        ((stats_df['count'] > stats_df['max_count'] * SIGNIFICANT_TECH_RATIO) | (stats_df['count'] > 5000)) & 
-        (stats_df['count'] > MIN_SAMPLES_FOR_REPORT) &
-        (stats_df['avg_signal'] > DEAD_ZONE_THRESHOLD)
-    ]
-    
-    # Create list of valid (Operator, Tech) tuples
-    valid_pairs = set(zip(valid_rows['operator'], valid_rows['tech']))
-    
-    # Filter the Main Dataframe used for Report & Charts
-    df_clean_report = df_new[df_new.apply(lambda x: (x['operator'], x['tech']) in valid_pairs, axis=1)].copy()
-
-    if df_clean_report.empty:
-        log("⚠️ No valid data remained after filtering.")
-        return 0, 0
-
-    # Generate charts using only valid/significant data
-    generate_internal_charts(df_clean_report)
-
     log("\n" + "="*50)
     log("📊 ULTIMATE NETWORK COMPARISON REPORT")
-    log(f"Operators Included: {df_clean_report['operator'].unique()}")
+    log(f"Operators Included: {operators}")
     log("="*50)
     
     # [1] SIGNAL STRENGTH
     log("\n[1] SIGNAL STRENGTH DISTRIBUTION (RSRP)")
-    def classify(r):
-        if r >= RSRP_EXCELLENT: return '1. Excellent'
-        if r >= RSRP_GOOD: return '2. Good'
-        if r >= RSRP_POOR: return '3. Fair'
-        return '4. Dead Zone'
-    
-    df_clean_report['qual'] = df_clean_report['rsrp'].apply(classify)
-    stats = df_clean_report.groupby(['operator', 'tech', 'qual']).size().unstack(fill_value=0)
-    stats_percent = (stats.div(stats.sum(axis=1), axis=0) * 100)
-    log_df(stats_percent)
+    log_distribution(distributions['rsrp'])
+    log("\n[1b] SIGNAL QUALITY DISTRIBUTION (SNR)")
+    log_distribution(distributions['snr'])
+    log("\n[1c] SIGNAL QUALITY DISTRIBUTION (RSRQ)")
+    log_distribution(distributions['rsrq'])
 
     # [2] POLLUTION
     log("\n[2] QUALITY ISSUES (RSRP > Good but Low Quality)")
-    for op in df_clean_report['operator'].unique():
-        op_df = df_clean_report[df_clean_report['operator'] == op]
-        good_count = len(op_df[op_df['rsrp'] > RSRP_GOOD])
-        
-        if good_count > 0:
-            missing_snr = op_df['snr'].isna().sum()
-            missing_ratio = missing_snr / len(op_df)
-            zero_count = (op_df['snr'] == 0.0).sum()
-            zero_ratio = zero_count / len(op_df)
+    for op, row in profile.iterrows():
+        if row['good'] > 0:
+            missing_ratio = row['missing_snr'] / row['samples']
+            zero_ratio = row['zero_snr'] / row['samples']
             
             # --- SNR CHECK ---
             if missing_ratio > 0.5 or zero_ratio > 0.5:
                 log(f"  - {op}: ⚠️ SNR Unsupported (Sensor Missing/Incompatible)")
             else:
-                bad_combined = len(op_df[(op_df['rsrp'] > RSRP_GOOD) & ((op_df['snr'] < 5) | (op_df['rsrq'] < -15))])
-                log(f"  - {op}: {(bad_combined/good_count)*100:.1f}% Polluted")
+                log(f"  - {op}: {(row['polluted']/row['good'])*100:.1f}% Polluted")
         else:
             log(f"  - {op}: Insufficient 'Good' signal samples.")
 
     # [3] HANDOVER STABILITY
     log("\n[3] HANDOVER STABILITY")
-    df_sorted = df_clean_report.sort_values(['operator', 'datetime'])
-    for op in df_clean_report['operator'].unique():
-        op_df = df_sorted[df_sorted['operator'] == op].copy()
-        true_duration_min = calculate_true_duration(op_df)
-        
-        op_df['pci_shift'] = op_df['pci'].shift(1)
-        switches = len(op_df[op_df['pci'] != op_df['pci_shift']]) - 1
-        if switches < 0: switches = 0
-
+    for op, row in profile.iterrows():
+        true_duration_min = row['duration_s'] / 60.0
         if true_duration_min > 1:
-            rate = switches / true_duration_min
-            log(f"  - {op}: {rate:.2f} switches/min")
+            rate = row['switches'] / true_duration_min
+            log(f"  - {op}: {rate:.2f} switches/min ({row['sessions']:.0f} sessions, {true_duration_min:.0f} min, "
+                f"{row['dwell_s'] / 60.0:.0f} min standing)")
     
     # [4] CONSISTENCY
     log("\n[4] QUALITY SCORES (By Tech)")
-    stats_df = df_clean_report.groupby(['operator', 'tech']).agg({
-        'rsrp': ['mean', 'std'], 
-        'snr': 'mean',
-        'rsrq': 'mean'
-    })
-    stats_df.columns = ['Avg RSRP', 'Stability', 'Avg SNR', 'Avg RSRQ']
-    log_df(stats_df)
+    log_df(scores)
 
     # [5] MOBILITY
     log("\n[5] MOBILITY PROFILE")
-    for op in df_clean_report['operator'].unique():
-        op_df = df_clean_report[df_clean_report['operator'] == op]
-        total_pts = len(op_df)
-        if total_pts == 0: continue
+    for op, row in profile.iterrows():
+        if row['samples'] == 0: continue
         
-        vehicle_count = len(op_df[op_df['speed'] >= MOBILITY_THRESHOLD])
-        vehicle_pct = (vehicle_count / total_pts) * 100
+        vehicle_pct = (row['vehicle'] / row['samples']) * 100
         walking_pct = 100 - vehicle_pct
         log(f"  - {op}: {vehicle_pct:.0f}% Vehicle | {walking_pct:.0f}% Walking")
 
     # [6] DISTANCE
     log("\n[6] DISTANCE & COVERAGE")
-    dist_df = df_clean_report.sort_values(['operator', 'datetime']).copy()
-    dist_df['prev_lat'] = dist_df.groupby('operator')['lat'].shift(1)
-    dist_df['prev_lon'] = dist_df.groupby('operator')['lon'].shift(1)
-    dist_df['dist_km'] = haversine_vectorized(dist_df['lat'], dist_df['lon'], dist_df['prev_lat'], dist_df['prev_lon'])
-    dist_df = dist_df[dist_df['dist_km'] < 1.0] 
-
-    total_dist_stats = dist_df.groupby('operator')['dist_km'].sum()
-    unique_counts = df_clean_report.groupby('operator')['grid_id'].nunique() 
-
-    for op in df_clean_report['operator'].unique():
-        t_dist = total_dist_stats.get(op, 0)
-        u_dist = unique_counts.get(op, 0) * 0.011 
-        log(f"  - {op}: {t_dist:.2f} km Driven | ~{u_dist:.2f} km Unique Coverage")
+    for op, row in profile.iterrows():
+        u_dist = row['unique_cells'] * 0.011 
+        log(f"  - {op}: {row['dist_km']:.2f} km Driven | ~{u_dist:.2f} km Unique Coverage")
 
     log("\n" + "="*50)
     report_path = os.path.join(EXPORT_DIR, 'network_comparison_report.txt')
@@ -392,102 +665,425 @@ def analyze_data(df):
         f.write('\n'.join(report_buffer))
     print(f"📄 Report saved to: {report_path}")
     
-    return total_dist_stats.sum(), unique_counts.sum() * 0.011
+    return profile['dist_km'].sum(), profile['unique_cells'].sum() * 0.011
 
-def spatial_averaging(df):
-    if df.empty: return df
-    df['grid_lat'] = df['lat'].round(GEO_PRECISION)
-    df['grid_lon'] = df['lon'].round(GEO_PRECISION)
-    
-    df_agg = df.groupby(['grid_lat', 'grid_lon', 'operator', 'tech']).agg({
-        'rsrp': 'mean', 
-        'snr': 'mean', 
-        'rsrq': 'mean',
-        'lat': 'mean', 
-        'lon': 'mean',
-        'pci': lambda x: x.mode()[0] if not x.mode().empty else np.nan
-    }).reset_index()
-    
-    return df_agg
+def analyze_data(df, chart_sets=CHART_SETS, stats=None):
+    if df.empty: return 0, 0
 
-def spatial_averaging_combined(df):
-    """ Creates ONE map file per operator (merging all techs) """
-    if df.empty: return pd.DataFrame()
-    df['grid_lat'] = df['lat'].round(GEO_PRECISION)
-    df['grid_lon'] = df['lon'].round(GEO_PRECISION)
-    
-    df_agg = df.groupby(['grid_lat', 'grid_lon', 'operator']).agg({
-        'rsrp': 'mean', 'snr': 'mean', 'rsrq': 'mean',
-        'lat': 'mean', 'lon': 'mean',
-        'pci': lambda x: x.mode()[0] if not x.mode().empty else np.nan
-    }).reset_index()
+    with stage(stats, 'report', rows_in=len(df)) as st:
+        # assign() adds the cell key without copying the sample columns
+        df_new = df.assign(cell=cell_keys(df['lat'], df['lon'], GEO_PRECISION))
+
+        # --- INTELLIGENT FILTERING FOR REPORT ---
+        # Count samples + average signal per Operator + Tech (single groupby pass)
+        stats_df = df_new.groupby(['operator', 'tech'], observed=True).agg(
+            count=('rsrp', 'size'),
+            avg_signal=('rsrp', 'mean')
+        )
+        
+        # Filter the Main Dataframe used for Report & Charts (semi-join on the valid (Operator, Tech) pairs)
+        keep = in_pairs(df_new, significant_pairs(stats_df))
+        df_clean_report = df_new if keep.all() else df_new[keep]
+        st['rows_out'] = len(df_clean_report)
+
+    if df_clean_report.empty:
+        print("⚠️ No valid data remained after filtering.")
+        return 0, 0
+
+    # Generate charts using only valid/significant data (rendered in the background while the report is built)
+    with stage(stats, 'charts'):
+        charts = start_chart_rendering(chart_jobs(*chart_tables(df_clean_report), chart_sets))
+
+    with stage(stats, 'report'):
+        operators = pd.Series(df_clean_report['operator'].unique().astype(str)).sort_values().unique()
+        
+        distributions = quality_distributions(df_clean_report)
+
+        profile = operator_profile(df_clean_report)
+        profile = profile.reindex(operators)
+        located = df_clean_report[df_clean_report['cell'] != INVALID_CELL]
+        profile['unique_cells'] = located.groupby('operator', observed=True)['cell'].nunique()
+        profile['sessions'] = session_keys(df_clean_report).groupby('operator', observed=True).size()
+
+        scores = df_clean_report.groupby(['operator', 'tech'], observed=True).agg({
+            'rsrp': ['mean', 'std'], 
+            'snr': 'mean',
+            'rsrq': 'mean'
+        })
+        scores.columns = ['Avg RSRP', 'Stability', 'Avg SNR', 'Avg RSRQ']
+
+        totals = write_report(operators, distributions, profile, scores)
+
+    # Charts still rendering once the report is written
+    with stage(stats, 'charts'):
+        wait_for_charts(charts)
+    return totals
+
+MAP_KEYS = ['cell', 'operator', 'tech']
+MAP_METRICS = ['rsrp', 'snr', 'rsrq', 'lat', 'lon']
+
+def with_grid_columns(df_agg, precision=GEO_PRECISION):
+    """ Swaps the int64 `cell` key of an aggregate for the grid_lat / grid_lon columns the map files carry """
+    grid_lat, grid_lon = cell_centers(df_agg['cell'], precision)
+    df_agg = df_agg.drop(columns='cell')
+    df_agg.insert(0, 'grid_lat', grid_lat)
+    df_agg.insert(1, 'grid_lon', grid_lon)
     return df_agg
 
+def located_cells(df, precision=GEO_PRECISION):
+    cells = df.assign(cell=cell_keys(df['lat'], df['lon'], precision))
+    return cells[cells['cell'] != INVALID_CELL]
+
+def modal_pci(pci_counts, keys, runner_up=False):
+    """
+    Dominant PCI per `keys` group from sample counts indexed by keys + ['pci'].
+    Highest count wins and ties go to the lowest PCI (same as Series.mode()[0]).
+    With runner_up=True, also returns `pci_2nd_share`: the fraction of samples on the second most common
+    PCI, which flags cells where the phone keeps bouncing between towers.
+    """
+    ranked = pci_counts.rename('n').reset_index().sort_values(
+        keys + ['n', 'pci'], ascending=[True] * len(keys) + [False, True]
+    )
+    rank = ranked.groupby(keys, sort=False, observed=True).cumcount().to_numpy()
+    result = ranked[rank == 0].set_index(keys)[['pci']]
+    if runner_up:
+        total = ranked.groupby(keys, observed=True)['n'].sum()
+        second = ranked[rank == 1].set_index(keys)['n'].reindex(total.index, fill_value=0)
+        result['pci_2nd_share'] = second / total
+    return result
+
+def map_partials(df, precision=GEO_PRECISION):
+    """ Mergeable per-(cell, operator, tech) metric sums / non-null counts plus the PCI histogram """
+    cells = located_cells(df, precision)
+    g = cells.groupby(MAP_KEYS, observed=True)[MAP_METRICS]
+    return {
+        'sums': g.sum().join(g.count().add_suffix('_n')),
+        'pci': cells.groupby(MAP_KEYS + ['pci'], observed=True).size()
+    }
+
+def cell_means(sums, pci_counts, keys, precision=GEO_PRECISION, runner_up=False):
+    df_agg = pd.DataFrame({m: sums[m] / sums[m + '_n'] for m in MAP_METRICS})
+    df_agg = df_agg.join(modal_pci(pci_counts, keys, runner_up))
+    return with_grid_columns(df_agg.reset_index(), precision)
+
+def finalize_maps(map_parts, precision=GEO_PRECISION, runner_up=False):
+    """
+    Split (cell, operator, tech) and combined (cell, operator) map tables from map partials.
+    The combined map is a count-weighted roll-up of the per-tech sums, so the data is only grouped once.
+    """
+    combined_keys = ['cell', 'operator']
+    df_map_split = cell_means(map_parts['sums'], map_parts['pci'], MAP_KEYS, precision, runner_up)
+    df_map_combined = cell_means(
+        map_parts['sums'].groupby(level=combined_keys, observed=True).sum(),
+        map_parts['pci'].groupby(level=combined_keys + ['pci'], observed=True).sum(),
+        combined_keys,
+        precision,
+        runner_up
+    )
+    return df_map_split, df_map_combined
+
+def coarsen_partials(map_parts, factor, precision=GEO_PRECISION):
+    """ Map partials rolled up onto a grid `factor` times coarser; their cell keys are at precision + 1 """
+    def rekey(table):
+        names = list(table.index.names)
+        flat = table.reset_index()
+        flat['cell'] = coarsen_cells(flat['cell'], precision, factor)
+        return flat.groupby(names, observed=True).sum()
+    return {
+        'sums': rekey(map_parts['sums']),
+        'pci': rekey(map_parts['pci'].rename('n'))['n']
+    }
+
+def spatial_averaging(df, precision=GEO_PRECISION, runner_up=False):
+    """ (split, combined) map tables: ONE file per operator+tech, plus ONE per operator merging all techs """
+    return finalize_maps(map_partials(df, precision), precision, runner_up)
+
+def safe_filename_part(name):
+    return "".join(x for x in name if x.isalnum() or x in " _-").strip().replace(" ", "_")
+
+def export_maps(df_map_split, df_map_combined, workers=EXPORT_WORKERS, export_dir=EXPORT_DIR):
+    """ Writes every map file from one groupby partition pass per table, optionally on a thread pool """
+    os.makedirs(export_dir, exist_ok=True)
+    def write_all(jobs):
+        def write(job):
+            df_part, filename = job
+            df_part.to_csv(os.path.join(export_dir, filename), index=False)
+            return filename
+        if workers > 1 and len(jobs) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(write, jobs))
+        return [write(job) for job in jobs]
+
+    # EXPORT SPLIT MAPS (4G, 5G...)
+    print(f"\n💾 EXPORTING SPLIT MAPS TO '{export_dir}/' ...")
+    jobs = [
+        (df_op_tech, f"signal_map_{safe_filename_part(op_name)}_{tech_name.replace(' ', '_')}.csv")
+        for (op_name, tech_name), df_op_tech in df_map_split.groupby(['operator', 'tech'], sort=False, observed=True)
+    ]
+    for filename in write_all(jobs):
+        print(f"  ✅ Saved: {filename}")
+
+    # EXPORT COMBINED MAPS (ALL_COMBINED)
+    print(f"\n💾 EXPORTING COMBINED MAPS (Gap-Free) ...")
+    jobs = [
+        (df_op_all, f"signal_map_{safe_filename_part(op_name)}_ALL_COMBINED.csv")
+        for op_name, df_op_all in df_map_combined.groupby('operator', sort=False, observed=True)
+    ]
+    for filename in write_all(jobs):
+        print(f"  🌎 Saved: {filename} (Full Coverage)")
+
+    # COLUMNAR COPY (Parquet, partitioned by operator/tech) for dashboards & Kepler pipelines
+    if not map_store.pyarrow_available():
+        print("\n⚠️ Skipping Parquet map export (install 'pyarrow' to enable it).")
+        return
+    path = map_store.write_signal_maps(df_map_split, df_map_combined, export_dir)
+    print(f"\n🗃️ Saved columnar dataset: {path}")
+
+def export_zoomed_maps(map_parts, factors, runner_up=False, workers=EXPORT_WORKERS):
+    """ Coarser map sets rolled up from the fine partials (no re-read of the logs); returns the rows written """
+    rows = 0
+    for factor in factors:
+        df_map_split, df_map_combined = finalize_maps(coarsen_partials(map_parts, factor), GEO_PRECISION + 1, runner_up)
+        print(f"\n🔭 Zoomed-out maps: {factor}x coarser grid")
+        export_maps(df_map_split, df_map_combined, workers, os.path.join(EXPORT_DIR, f"zoom_x{factor}"))
+        rows += len(df_map_split) + len(df_map_combined)
+    return rows
+
 # ==========================================
-# 7. EXECUTION
+# 7. STREAMING MODE (archives larger than RAM)
 # ==========================================
-if __name__ == "__main__":
-    df_combined = load_all_csvs()
-    
-    if not df_combined.empty:
-        os.makedirs(EXPORT_DIR, exist_ok=True)
-        
-        # 1. Filter
-        df_clean = remove_stationary_data(df_combined)
-        
-        if df_clean.empty:
-            print("❌ All data was stationary!")
-            exit()
-            
-        # 2. Analyze
+def iter_log_chunks(log_files, chunksize, errors):
+    """ Cleaned chunks of at most `chunksize` rows, file by file; read failures are appended to `errors` """
+    for f in log_files:
         try:
-            total_km_travelled, total_unique_km = analyze_data(df_clean)
+            for raw in read_signal_csv(f, chunksize=chunksize):
+                yield sanitize_metrics(prepare_signal_frame(raw, log_device(f)))
         except Exception as e:
-            print(f"❌ Analysis Failed: {e}")
-            import traceback
-            traceback.print_exc()
-            total_km_travelled = 0
-            total_unique_km = 0
+            errors.append((f, f"{type(e).__name__}: {e}"))
+
+def iter_clean_chunks(log_files, chunksize, errors):
+    """ Segmented, stationary-filtered chunks; the last row of every stream seeds the segmentation of the next """
+    carry = None
+    for chunk in iter_log_chunks(log_files, chunksize, errors):
+        if chunk.empty: continue
+        chunk, carry = segment_tracks(chunk, carry)
+        yield chunk[~chunk['stationary']]
+
+def merge_partials(acc, part):
+    if acc is None: return part
+    return {k: merge_partials(acc[k], part[k]) if isinstance(acc[k], dict) else acc[k].add(part[k], fill_value=0)
+            for k in acc}
+
+def pair_partials(df):
+    """ Mergeable per-(operator, tech) sizes, sums, sums of squares and quality bucket counts """
+    sums = df.assign(rsrp_sq=df['rsrp'] ** 2).groupby(PAIR_KEYS, observed=True).agg(
+        count=('rsrp', 'size'),
+        rsrp_n=('rsrp', 'count'), rsrp_sum=('rsrp', 'sum'), rsrp_sq=('rsrp_sq', 'sum'),
+        snr_n=('snr', 'count'), snr_sum=('snr', 'sum'),
+        rsrq_n=('rsrq', 'count'), rsrq_sum=('rsrq', 'sum')
+    )
+    return {
+        'sums': sums,
+        'bins': quality_distributions(df),
+        'category': bin_table(df, PAIR_KEYS, 'rsrp', RSRP_CHART_BINS, 'category')
+    }
+
+def stream_partials(log_files, chunksize=STREAM_CHUNK_ROWS):
+    """ Pass 1: (pair partials, map partials, clean sample count) without holding more than one chunk """
+    errors = []
+    pairs, maps, n_clean = None, None, 0
+    for chunk in iter_clean_chunks(log_files, chunksize, errors):
+        if chunk.empty: continue
+        n_clean += len(chunk)
+        pairs = merge_partials(pairs, pair_partials(chunk))
+        maps = merge_partials(maps, map_partials(chunk))
+    report_ingest_errors(errors)
+    return pairs, maps, n_clean
+
+def distinct_rows(parts):
+    return pd.concat(parts, ignore_index=True).drop_duplicates(ignore_index=True)
+
+def add_distinct(parts, frame):
+    """
+    Appends a chunk's distinct rows to `parts`; once the pending rows outnumber the deduplicated head,
+    everything is merged into a new head. Each row is merged a bounded number of times (linear, not
+    quadratic in the chunk count) and memory stays within about twice the distinct rows.
+    """
+    parts.append(frame)
+    if sum(len(p) for p in parts[1:]) > len(parts[0]):
+        parts[:] = [distinct_rows(parts)]
+
+def analyze_stream(log_files, pairs, chunksize=STREAM_CHUNK_ROWS, chart_sets=CHART_SETS, stats=None):
+    """
+    Pass 2: same report as analyze_data, built from the pass-1 partials plus a replay of the clean stream
+    for the order-dependent stats (handovers, durations, distance, unique cells).
+    Those match the in-memory run when the logs are chronological in the given file order.
+    """
+    sums = pairs['sums']
+    with stage(stats, 'report', rows_in=sums['count'].sum()) as st:
+        stats_df = pd.DataFrame({'count': sums['count'], 'avg_signal': sums['rsrp_sum'] / sums['rsrp_n']})
+        valid_pairs = significant_pairs(stats_df)
+    
+        if len(valid_pairs) == 0:
+            print("⚠️ No valid data remained after filtering.")
+            return 0, 0
+        valid = sums.loc[valid_pairs]
+        st['rows_out'] = valid['count'].sum()
+
+    # Charts
+    avg_rsrp = valid['rsrp_sum'] / valid['rsrp_n']
+    with stage(stats, 'charts'):
+        charts = start_chart_rendering(chart_jobs(avg_rsrp, observed_bins(pairs['category'].loc[valid_pairs]), chart_sets))
+
+    with stage(stats, 'report'):
+        distributions = {metric: table.loc[valid_pairs] for metric, table in pairs['bins'].items()}
+
+        n = valid['rsrp_n']
+        variance = ((valid['rsrp_sq'] - valid['rsrp_sum'] ** 2 / n) / (n - 1)).clip(lower=0)
+        scores = pd.DataFrame({
+            'Avg RSRP': valid['rsrp_sum'] / n,
+            'Stability': np.sqrt(variance.where(n > 1)),
+            'Avg SNR': valid['snr_sum'] / valid['snr_n'],
+            'Avg RSRQ': valid['rsrq_sum'] / valid['rsrq_n']
+        })
+
+        profile, cells, sessions, order = None, [], [], []
+        for chunk in iter_clean_chunks(log_files, chunksize, []):
+            chunk = chunk[in_pairs(chunk, valid_pairs)]
+            if chunk.empty: continue
+            order.extend(op for op in chunk['operator'].unique() if op not in order)
         
-        # 3. EXPORT SPLIT MAPS (4G, 5G...)
-        print(f"\n💾 EXPORTING SPLIT MAPS TO '{EXPORT_DIR}/' ...")
-        df_map_split = spatial_averaging(df_clean)
-        unique_combinations = df_map_split[['operator', 'tech']].drop_duplicates()
+            part = operator_profile(chunk)
+            profile = part if profile is None else profile.add(part, fill_value=0)
         
-        for index, row in unique_combinations.iterrows():
-            op_name = row['operator']
-            tech_name = row['tech']
-            
-            df_op_tech = df_map_split[(df_map_split['operator'] == op_name) & (df_map_split['tech'] == tech_name)]
-            
-            # Simple export logic: Just don't export if empty
-            if len(df_op_tech) > 0:
-                safe_op = "".join(x for x in op_name if x.isalnum() or x in " _-").strip().replace(" ", "_")
-                safe_tech = tech_name.replace(" ", "_")
-                filename = f"signal_map_{safe_op}_{safe_tech}.csv"
-                df_op_tech.to_csv(os.path.join(EXPORT_DIR, filename), index=False)
-                print(f"  ✅ Saved: {filename}")
-
-        # 4. EXPORT COMBINED MAPS (ALL_COMBINED)
-        print(f"\n💾 EXPORTING COMBINED MAPS (Gap-Free) ...")
-        df_map_combined = spatial_averaging_combined(df_clean)
-        unique_ops = df_map_combined['operator'].unique()
+            add_distinct(cells, located_cells(chunk)[['operator', 'cell']].drop_duplicates())
+            add_distinct(sessions, session_keys(chunk))
+
+        operators = pd.Series(order).sort_values().unique()
+        profile = profile.reindex(operators)
+        profile['unique_cells'] = distinct_rows(cells).groupby('operator', observed=True).size()
+        profile['sessions'] = distinct_rows(sessions).groupby('operator', observed=True).size()
+
+        totals = write_report(operators, distributions, profile, scores)
+
+    with stage(stats, 'charts'):
+        wait_for_charts(charts)
+    return totals
+
+# ==========================================
+# 8. EXECUTION
+# ==========================================
+def print_summary(n_clean, total_km_travelled, total_unique_km):
+    print("\n" + "="*50)
+    print("📉 DATA VOLUME & DISTANCE SUMMARY")
+    print("="*50)
+    print(f"1. Samples After Cleaning:      {n_clean:,}")
+    print(f"2. Total Distance Travelled:    {total_km_travelled:.2f} km")
+    print(f"3. Total Unique Coverage Est:   ~{total_unique_km:.2f} km")
+    print("="*50 + "\n")
+
+def run_analysis(analyze, *args):
+    try:
+        return analyze(*args)
+    except Exception as e:
+        print(f"❌ Analysis Failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return 0, 0
+
+def write_run_summary(stats, mode, **extra):
+    """ Saves the per-stage JSON summary next to the report (only once the export folder exists) """
+    if stats is None or not os.path.isdir(EXPORT_DIR): return
+    stats.write(RUN_SUMMARY_FILE, mode=mode, **extra)
+
+def run_in_memory(runner_up=False, export_workers=EXPORT_WORKERS, chart_sets=CHART_SETS, stats=None, zoom_out=MAP_ZOOM_OUT):
+    with stage(stats, 'ingest') as st:
+        df_combined = load_all_csvs()
+        st['rows_out'] = len(df_combined)
+    
+    if df_combined.empty:
+        print("❌ No CSV files found.")
+        return
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    
+    # 1. Filter
+    with stage(stats, 'stationary_filter', rows_in=len(df_combined)) as st:
+        df_clean = remove_stationary_data(df_combined)
+        st['rows_out'] = len(df_clean)
+    
+    if df_clean.empty:
+        print("❌ All data was stationary!")
+        write_run_summary(stats, 'memory')
+        return
         
-        for op_name in unique_ops:
-            df_op_all = df_map_combined[df_map_combined['operator'] == op_name]
-            safe_op = "".join(x for x in op_name if x.isalnum() or x in " _-").strip().replace(" ", "_")
-            filename = f"signal_map_{safe_op}_ALL_COMBINED.csv"
-            df_op_all.to_csv(os.path.join(EXPORT_DIR, filename), index=False)
-            print(f"  🌎 Saved: {filename} (Full Coverage)")
-
-        # 5. Summary
-        print("\n" + "="*50)
-        print("📉 DATA VOLUME & DISTANCE SUMMARY")
-        print("="*50)
-        print(f"1. Samples After Cleaning:      {len(df_clean):,}")
-        print(f"2. Total Distance Travelled:    {total_km_travelled:.2f} km")
-        print(f"3. Total Unique Coverage Est:   ~{total_unique_km:.2f} km")
-        print("="*50 + "\n")
+    # 2. Analyze
+    total_km_travelled, total_unique_km = run_analysis(analyze_data, df_clean, chart_sets, stats)
+    
+    # 3. Export maps
+    with stage(stats, 'map_export', rows_in=len(df_clean)) as st:
+        maps = map_partials(df_clean)
+        df_map_split, df_map_combined = finalize_maps(maps, runner_up=runner_up)
+        st['rows_out'] = len(df_map_split) + len(df_map_combined)
+        export_maps(df_map_split, df_map_combined, workers=export_workers)
+        st['rows_out'] += export_zoomed_maps(maps, zoom_out, runner_up, export_workers)
 
-    else:
+    # 4. Summary
+    print_summary(len(df_clean), total_km_travelled, total_unique_km)
+    write_run_summary(stats, 'memory', samples_clean=len(df_clean), km_travelled=round(float(total_km_travelled), 3))
+
+def run_streaming(chunksize, runner_up=False, export_workers=EXPORT_WORKERS, chart_sets=CHART_SETS, stats=None,
+                  zoom_out=MAP_ZOOM_OUT):
+    log_files, errors = find_signal_logs()
+    report_ingest_errors(errors)
+    
+    if not log_files:
         print("❌ No CSV files found.")
+        return
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    
+    # SignalService names logs Signal_Log_Advanced_<yyyyMMdd_HHmmss>.csv, so name order is chronological
+    log_files = sorted(log_files)
+    # Pass 1 reads, filters and aggregates in one go, so ingest and the stationary filter share a stage
+    with stage(stats, 'stream_pass1') as st:
+        pairs, maps, n_clean = stream_partials(log_files, chunksize)
+        st['rows_out'] = n_clean
+        st['files'] = len(log_files)
+    
+    if n_clean == 0:
+        print("❌ All data was stationary!")
+        write_run_summary(stats, 'stream')
+        return
+    
+    total_km_travelled, total_unique_km = run_analysis(analyze_stream, log_files, pairs, chunksize, chart_sets, stats)
+    with stage(stats, 'map_export', rows_in=n_clean) as st:
+        df_map_split, df_map_combined = finalize_maps(maps, runner_up=runner_up)
+        st['rows_out'] = len(df_map_split) + len(df_map_combined)
+        export_maps(df_map_split, df_map_combined, workers=export_workers)
+        st['rows_out'] += export_zoomed_maps(maps, zoom_out, runner_up, export_workers)
+    print_summary(n_clean, total_km_travelled, total_unique_km)
+    write_run_summary(stats, 'stream', chunk_rows=chunksize, samples_clean=int(n_clean),
+                      km_travelled=round(float(total_km_travelled), 3))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cellular signal log analyzer")
+    parser.add_argument('--stream', action='store_true',
+                        help="process logs in bounded-memory chunks (for archives larger than RAM)")
+    parser.add_argument('--chunk-rows', type=int, default=STREAM_CHUNK_ROWS,
+                        help="rows per chunk in --stream mode")
+    parser.add_argument('--pci-runner-up', action='store_true',
+                        help="add pci_2nd_share (share of the second most common PCI) to the map files")
+    parser.add_argument('--export-workers', type=int, default=EXPORT_WORKERS,
+                        help="threads used to write the signal_map files")
+    parser.add_argument('--charts', nargs='+', default=list(CHART_SETS), choices=['overall', 'operator', 'tech'],
+                        help="chart sets to render")
+    parser.add_argument('--profile', choices=PROFILERS,
+                        help=f"profile every stage (saved under {PROFILE_DIR})")
+    parser.add_argument('--zoom-out', type=int, nargs='+', default=list(MAP_ZOOM_OUT), metavar='FACTOR',
+                        help="also export maps on grids FACTOR times coarser, e.g. 10 100")
+    args = parser.parse_args()
+
+    stats = RunStats(args.profile, PROFILE_DIR)
+    if args.stream:
+        run_streaming(args.chunk_rows, args.pci_runner_up, args.export_workers, args.charts, stats, args.zoom_out)
+    else:
+        run_in_memory(args.pci_runner_up, args.export_workers, args.charts, stats, args.zoom_out)
@@ -1,17 +1,161 @@
 import os
 import re
+import json
+import hashlib
+import numpy as np
 import pandas as pd
 import pytesseract
-from PIL import Image, ImageOps
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
 import sys
 
 # Regex Patterns
 RSRP_PATTERN = r"RSRP:(-?\d+)"
 SNR_PATTERN = r"SNR:(\d+\.?\d*)"
 
-def process_images(folder_path):
+# Preprocessing
+CROP_BOX = None  # optional (left, top, right, bottom) as fractions of the screenshot, e.g. (0, 0, 1, 0.5)
+CROP_PADDING = 10  # px kept around the detected text block
+OCR_WORKERS = os.cpu_count() or 1
+
+# OCR passes as (threshold on the inverted grayscale, tesseract config). They run in order until the
+# RSRP/SNR words reach MIN_CONFIDENCE; otherwise the most confident reading is kept.
+OCR_PASSES = [
+    (150, '--psm 6'),
+    (120, '--psm 6'),
+    (180, '--psm 6'),
+    (150, '--psm 4'),
+    (150, '--psm 11'),
+]
+MIN_CONFIDENCE = 70  # tesseract word confidence, 0-100
+
+# Results cache: one JSON line per image inside the screenshot folder, keyed by content hash and valid only
+# for the settings_digest() it was read under (changing the crop, passes or patterns re-reads the images)
+CACHE_FILE = ".ocr_cache.jsonl"
+
+def luma(img):
+    """ Inverted grayscale as an array (same values as ImageOps.invert -> convert('L')), after CROP_BOX """
+    rgb = np.asarray(img.convert('RGB'))
+    if CROP_BOX:
+        h, w = rgb.shape[:2]
+        left, top, right, bottom = CROP_BOX
+        rgb = rgb[int(top * h):int(bottom * h), int(left * w):int(right * w)]
+
+    inv = 255 - rgb.astype(np.uint32)
+    # PIL's fixed-point ITU-R 601-2 luma, so thresholds behave exactly like convert('L')
+    return (inv[..., 0] * 19595 + inv[..., 1] * 38470 + inv[..., 2] * 7471 + 0x8000) >> 16
+
+def binarize(gray, threshold):
+    """ Lookup-table threshold (text -> black), cropped to the block of text so tesseract scans fewer pixels """
+    lut = np.where(np.arange(256) < threshold, 0, 255).astype(np.uint8)
+    bw = lut[gray]
+
+    ink_rows = np.flatnonzero((bw == 0).any(axis=1))
+    ink_cols = np.flatnonzero((bw == 0).any(axis=0))
+    if len(ink_rows) and len(ink_cols):
+        top, bottom = max(ink_rows[0] - CROP_PADDING, 0), ink_rows[-1] + CROP_PADDING + 1
+        left, right = max(ink_cols[0] - CROP_PADDING, 0), ink_cols[-1] + CROP_PADDING + 1
+        bw = bw[top:bottom, left:right]
+    return Image.fromarray(bw)
+
+def read_lines(img, config):
+    """ Tesseract words with their confidence, grouped per text line """
+    data = pytesseract.image_to_data(img, config=config, output_type=pytesseract.Output.DICT)
+    lines = {}
+    for i, word in enumerate(data['text']):
+        word, conf = word.strip(), float(data['conf'][i])
+        if not word or conf < 0: continue
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        lines.setdefault(key, []).append((word, conf))
+    return list(lines.values())
+
+def read_values(lines):
+    """
+    Text, parsed RSRP/SNR and a confidence for the reading: the lowest word confidence among the words
+    the RSRP and SNR matches were read from (0 when RSRP was not found).
+    """
+    text, spans = "", []
+    for line in lines:
+        for word, conf in line:
+            text += word if not text or text.endswith("\n") else " " + word
+            spans.append((len(text) - len(word), len(text), conf))
+        text += "\n"
+
+    values, confs = {}, []
+    for name, pattern in (("RSRP", RSRP_PATTERN), ("SNR", SNR_PATTERN)):
+        match = re.search(pattern, text)
+        values[name] = match.group(1) if match else "N/A"
+        if match:
+            start, end = match.span()
+            confs += [conf for s, e, conf in spans if s < end and e > start]
+
+    confidence = min(confs) if values["RSRP"] != "N/A" and confs else 0.0
+    return {
+        "text": text,
+        **values,
+        "confidence": confidence,
+        "words": [[word, conf] for line in lines for word, conf in line]
+    }
+
+def reading_rank(entry):
+    return (entry["RSRP"] != "N/A", entry["confidence"])
+
+def needs_pass(entry):
+    """ Untried OCR_PASSES for a cached reading that is still below MIN_CONFIDENCE """
+    if "confidence" not in entry:
+        return list(OCR_PASSES)  # written before confidence scoring
+    if entry["confidence"] >= MIN_CONFIDENCE:
+        return []
+    tried = {tuple(p) for p in entry.get("passes", [])}
+    return [p for p in OCR_PASSES if p not in tried]
+
+def ocr_image(job):
+    """ Worker: (reading, error) for one screenshot; runs the passes until one is confident enough """
+    img_path, entry = job
+    try:
+        passes = needs_pass(entry) if entry else list(OCR_PASSES)
+        best = entry if entry and "confidence" in entry else None
+        tried = list(best["passes"]) if best else []
+        with Image.open(img_path) as img:
+            gray = luma(img)
+        for threshold, config in passes:
+            reading = read_values(read_lines(binarize(gray, threshold), config))
+            reading["pass"] = [threshold, config]
+            tried.append([threshold, config])
+            if best is None or reading_rank(reading) > reading_rank(best):
+                best = reading
+            if best["confidence"] >= MIN_CONFIDENCE: break
+        best["passes"] = tried
+        return best, None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def settings_digest():
+    """ Fingerprint of the preprocessing and pass settings a reading depends on (MIN_CONFIDENCE is checked per entry) """
+    settings = [CROP_BOX, CROP_PADDING, OCR_PASSES, RSRP_PATTERN, SNR_PATTERN]
+    return hashlib.sha1(json.dumps(settings).encode()).hexdigest()[:16]
+
+def image_digest(img_path):
+    with open(img_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def load_cache(cache_path, settings):
+    """ Cached readings by image hash, only those made under `settings`; lines of other settings stay in the file """
+    cache = {}
+    if not os.path.exists(cache_path): return cache
+    with open(cache_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                if entry.pop('settings', None) != settings: continue
+                cache[entry.pop('sha1')] = entry
+            except (ValueError, KeyError, AttributeError):
+                continue  # a line cut short by an interrupted run
+    return cache
+
+def process_images(folder_path, workers=OCR_WORKERS):
     data = []
-    
+
     if not os.path.exists(folder_path):
         print(f"❌ Error: Folder '{folder_path}' not found.")
         return
@@ -19,39 +163,47 @@ def process_images(folder_path):
     files = [f for f in os.listdir(folder_path) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
     files.sort()
 
-    print(f"🔍 Found {len(files)} images. Starting OCR...")
+    cache_path = os.path.join(folder_path, CACHE_FILE)
+    settings = settings_digest()
+    cache = load_cache(cache_path, settings)
+    digests = [image_digest(os.path.join(folder_path, f)) for f in files]
+    todo = [i for i, d in enumerate(digests) if d not in cache or needs_pass(cache[d])]
+    retry = sum(d in cache for d in (digests[i] for i in todo))
+    print(f"🔍 Found {len(files)} images ({len(files) - len(todo)} cached, {retry} low-confidence retries). Starting OCR...")
+
+    # New results are appended as they arrive, so an interrupted run resumes where it stopped
+    with open(cache_path, 'a', encoding='utf-8') as cache_file:
+        jobs = [(os.path.join(folder_path, files[i]), cache.get(digests[i])) for i in todo]
+        if workers > 1 and len(jobs) > 1:
+            pool = ProcessPoolExecutor(max_workers=min(workers, len(jobs)))
+            results = pool.map(ocr_image, jobs, chunksize=4)
+        else:
+            pool, results = None, map(ocr_image, jobs)
 
-    for index, filename in enumerate(files, start=1):
         try:
-            img_path = os.path.join(folder_path, filename)
-            img = Image.open(img_path)
-            
-            # Optimization Pipeline
-            img = ImageOps.invert(img.convert('RGB')) # Invert
-            img = img.convert('L') # Grayscale
-            img = img.point(lambda x: 0 if x < 150 else 255) # Threshold
-
-            # OCR
-            text = pytesseract.image_to_string(img, config='--psm 6')
-            
-            rsrp = re.search(RSRP_PATTERN, text)
-            snr = re.search(SNR_PATTERN, text)
-            
-            rsrp_val = rsrp.group(1) if rsrp else "N/A"
-            snr_val = snr.group(1) if snr else "N/A"
-            
-            status = "✅" if (rsrp_val != "N/A") else "⚠️"
-            print(f"[{index}] {status} {filename} -> RSRP: {rsrp_val} | SNR: {snr_val}")
-            
-            data.append({
-                "ID": index,
-                "Filename": filename,
-                "RSRP": rsrp_val,
-                "SNR": snr_val
-            })
-
-        except Exception as e:
-            print(f"❌ Error on {filename}: {e}")
+            for i, (result, error) in zip(todo, results):
+                if error is not None:
+                    print(f"❌ Error on {files[i]}: {error}")
+                    continue
+                cache[digests[i]] = result
+                cache_file.write(json.dumps({"sha1": digests[i], "settings": settings, **result}) + "\n")
+                cache_file.flush()
+
+                status = "✅" if (result["RSRP"] != "N/A" and result["confidence"] >= MIN_CONFIDENCE) else "⚠️"
+                print(f"[{i + 1}] {status} {files[i]} -> RSRP: {result['RSRP']} | SNR: {result['SNR']} "
+                      f"({result['confidence']:.0f}% conf)")
+        finally:
+            if pool: pool.shutdown()
+
+    for index, (filename, digest) in enumerate(zip(files, digests), start=1):
+        if digest not in cache: continue
+        data.append({
+            "ID": index,
+            "Filename": filename,
+            "RSRP": cache[digest]["RSRP"],
+            "SNR": cache[digest]["SNR"],
+            "Confidence": cache[digest].get("confidence")
+        })
 
     if data:
         df = pd.DataFrame(data)
@@ -65,4 +217,4 @@ if __name__ == "__main__":
     target_folder = input("Enter path to folder containing screenshots: ").strip()
     # Remove quotes if user copied path as "C:\Path"
     target_folder = target_folder.replace('"', '').replace("'", "")
-    process_images(target_folder)
\ No newline at end of file
+    process_images(target_folder)
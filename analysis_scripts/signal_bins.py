@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# THRESHOLD BINNING
+# ==========================================
+# A scheme is ascending `edges` plus one label per bin, lowest bin first (len(labels) == len(edges) + 1).
+# A value equal to an edge falls in the bin above it, i.e. every threshold reads as ">= edge".
+# Missing values go to the `missing` label, or get code -1 (not counted) when that is None.
+
+def make_scheme(edges, labels, missing=None):
+    edges = np.asarray(edges, dtype=np.float64)
+    labels = list(labels)
+    if len(labels) != len(edges) + 1:
+        raise ValueError(f"need {len(edges) + 1} labels for {len(edges)} edges, got {len(labels)}")
+    if np.any(np.diff(edges) <= 0):
+        raise ValueError("bin edges must be strictly ascending")
+    return {
+        'edges': edges,
+        'labels': labels,
+        'missing': -1 if missing is None else labels.index(missing)
+    }
+
+def bin_codes(values, scheme):
+    """ int8 bin code per value from a single np.searchsorted over the edges """
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.searchsorted(scheme['edges'], values, side='right').astype(np.int8)
+    codes[np.isnan(values)] = scheme['missing']
+    return codes
+
+def bin_labels(values, scheme):
+    """ Same bins as a pandas Categorical (code -1 -> NaN) """
+    return pd.Categorical.from_codes(bin_codes(values, scheme), categories=scheme['labels'])
+
+def bin_table(df, keys, column, scheme, name=None):
+    """
+    Sample counts per `keys` group (rows, sorted) and bin (columns, best bin first) from one bincount
+    over group code x bin code; no per-row label strings are built.
+    """
+    labels = scheme['labels']
+    n_bins = len(labels)
+    grouper = df.groupby(keys, sort=True, observed=True)
+    groups = grouper.ngroup().to_numpy()
+    codes = bin_codes(df[column], scheme)
+
+    keep = (groups >= 0) & (codes >= 0)
+    flat = groups[keep].astype(np.int64) * n_bins + codes[keep]
+    n_groups = grouper.ngroups
+    counts = np.bincount(flat, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+
+    index = grouper.size().index
+    columns = pd.Index(labels[::-1], name=name or column)
+    return pd.DataFrame(counts[:, ::-1], index=index, columns=columns)
+
+def observed_bins(table):
+    """ Drops the bins no sample fell into """
+    return table.loc[:, table.sum(axis=0) > 0]
@@ -0,0 +1,59 @@
+import numpy as np
+
+# ==========================================
+# INTEGER GRID INDEX
+# ==========================================
+# A grid cell is (lat, lon) rounded to `precision` decimals, packed into ONE int64:
+#   high 32 bits -> quantized latitude  (+90°  offset, so it is never negative)
+#   low 32 bits  -> quantized longitude (+180° offset)
+# Precision 4 is the ~11 m grid used by the analyzer; anything up to 7 (~1 cm) fits in 32 bits.
+MAX_PRECISION = 7
+INVALID_CELL = -1  # rows with a missing/non-finite coordinate
+
+def _check_precision(precision):
+    if not 0 <= precision <= MAX_PRECISION:
+        raise ValueError(f"precision must be between 0 and {MAX_PRECISION}, got {precision}")
+
+def cell_keys(lat, lon, precision=4):
+    """ int64 cell key per point; same rounding as Series.round(precision) """
+    _check_precision(precision)
+    scale = 10 ** precision
+    lat_q = np.rint(np.asarray(lat, dtype=np.float64) * scale)
+    lon_q = np.rint(np.asarray(lon, dtype=np.float64) * scale)
+
+    valid = np.isfinite(lat_q) & np.isfinite(lon_q)
+    keys = np.full(len(lat_q), INVALID_CELL, dtype=np.int64)
+    lat_i = lat_q[valid].astype(np.int64) + 90 * scale
+    lon_i = lon_q[valid].astype(np.int64) + 180 * scale
+    keys[valid] = (lat_i << 32) | lon_i
+    return keys
+
+def _quantized(keys, precision):
+    keys = np.asarray(keys, dtype=np.int64)
+    scale = 10 ** precision
+    return (keys >> 32) - 90 * scale, (keys & 0xFFFFFFFF) - 180 * scale
+
+def cell_centers(keys, precision=4):
+    """ (grid_lat, grid_lon) float arrays, bit-identical to lat.round(precision) / lon.round(precision) """
+    _check_precision(precision)
+    lat_q, lon_q = _quantized(keys, precision)
+    scale = 10 ** precision
+    return lat_q / scale, lon_q / scale
+
+def coarsen_cells(keys, precision, factor):
+    """
+    Re-keys cells onto a grid `factor` times coarser without going back to the raw coordinates. Coarse
+    cells are floor-aligned blocks of factor x factor fine cells, so every fine cell (and every point in
+    it) belongs to exactly one block. The block keys are returned at `precision + 1`, where the block
+    centre is exact for any factor: cell_centers(coarse_keys, precision + 1) gives the block centres.
+    """
+    _check_precision(precision + 1)
+    if factor < 1:
+        raise ValueError(f"factor must be >= 1, got {factor}")
+    keys = np.asarray(keys, dtype=np.int64)
+    lat_q, lon_q = _quantized(keys, precision)
+    # Block origin in fine units -> block centre at one more decimal (10 * origin + 5 * (factor - 1))
+    scale = 10 ** (precision + 1)
+    lat_i = 10 * (lat_q // factor * factor) + 5 * (factor - 1) + 90 * scale
+    lon_i = 10 * (lon_q // factor * factor) + 5 * (factor - 1) + 180 * scale
+    return np.where(keys == INVALID_CELL, INVALID_CELL, (lat_i << 32) | lon_i)
@@ -0,0 +1,187 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# ==========================================
+# SYNTHETIC SIGNALSERVICE LOGS
+# ==========================================
+# Seeded drive logs in the exact format SignalService writes (header, HH:mm:ss stamps, SIM<n> slots,
+# LTE/5G/3G/2G types, Integer.MAX_VALUE SNR on phones without SINR, NO_SIGNAL rows), for benchmarks.
+# Every tick (one second) writes one row per SIM slot. The route alternates driving and stationary
+# stretches; while stationary the phone repeats its fix, RSRP and PCI, which the stationary filter drops.
+# With several devices, all handsets drive the same route (a few metres of GPS noise apart, each with its
+# own antenna offset), so their logs can also be fed to device_comparison.
+LOG_HEADER = ['Timestamp', 'Latitude', 'Longitude', 'Altitude', 'Speed', 'Operator', 'Slot', 'NetworkType',
+              'PCI', 'RSRP', 'RSRQ', 'SNR']
+
+# SPN variants seen per operator (promotions rename the network; smart_merge_names folds them together)
+OPERATOR_NAMES = {
+    'A1': ['A1 BG', 'A1'],
+    'YETTEL': ['Yettel BG', 'YETTEL'],
+    'VIVACOM': ['VIVACOM', 'Vivacom Promo'],
+    'VODAFONE': ['Vodafone TR'],
+    'TURK TELEKOM': ['TURK TELEKOM', 'Avea'],
+}
+DEFAULT_OPERATORS = ['A1', 'YETTEL', 'VIVACOM']
+
+# NetworkType -> (share of cells, PCI range); 2G rows log the cell id, hence the wide range
+TECH_MIX = {
+    'LTE': (0.60, 504),
+    '5G': (0.20, 1008),
+    '3G': (0.12, 512),
+    '2G': (0.08, 65536),
+}
+SNR_UNSUPPORTED = 2147483647  # Integer.MAX_VALUE
+SNR_UNSUPPORTED_SHARE = 0.3  # share of devices whose modem never reports SINR
+NO_SIGNAL_SHARE = 0.002  # ticks a slot loses service
+
+START_POSITION = (42.6977, 23.3219)  # lat, lon
+START_TIME = pd.Timestamp('2026-01-01 06:00:00')
+MAX_FILE_SECONDS = 16 * 3600  # stamps are HH:mm:ss, so a recording must not cross midnight
+DRIVE_SPEED = (13.0, 4.0)  # m/s mean, std
+STRETCH_SECONDS = 180  # mean length of a driving / stationary stretch
+
+ROWS_PER_FILE = 100_000
+PCI_CHURN = 0.02  # handovers per second while driving
+STATIONARY_SHARE = 0.2  # share of time spent parked
+GEN_WORKERS = os.cpu_count() or 1
+
+def drive_route(seconds, rng, stationary_share=STATIONARY_SHARE):
+    """ (lat, lon, speed m/s, moving mask) per second: a heading random walk broken by parked stretches """
+    lengths = rng.exponential(STRETCH_SECONDS, size=seconds // 10 + 2).astype(np.int64) + 1
+    parked = rng.random(len(lengths)) < stationary_share
+    moving = ~np.repeat(parked, lengths)[:seconds]
+
+    speed = np.clip(rng.normal(*DRIVE_SPEED, size=seconds), 1.0, 35.0) * moving
+    heading = np.cumsum(rng.normal(0.0, 0.05, size=seconds)) + rng.uniform(0, 2 * np.pi)
+    lat0, lon0 = START_POSITION
+    lat = lat0 + np.cumsum(speed * np.cos(heading)) / 111_320.0
+    lon = lon0 + np.cumsum(speed * np.sin(heading)) / (111_320.0 * np.cos(np.radians(lat0)))
+    return lat, lon, speed, moving
+
+def serving_cells(moving, rng, pci_churn=PCI_CHURN):
+    """ Cell index per second: a new cell after each handover, which only happens while driving """
+    handover = moving & (rng.random(len(moving)) < pci_churn)
+    return np.cumsum(handover)
+
+def slot_rows(seconds, moving, rng, pci_churn, operator):
+    """ NetworkType, PCI, RSRP, RSRQ, SNR arrays for one SIM slot, following SignalService's defaults """
+    cell = serving_cells(moving, rng, pci_churn)
+    n_cells = cell[-1] + 1
+    techs = np.array(list(TECH_MIX))
+    shares = np.array([share for share, _ in TECH_MIX.values()])
+    cell_tech = rng.choice(len(techs), size=n_cells, p=shares / shares.sum())
+    pci_range = np.array([span for _, span in TECH_MIX.values()])
+    cell_pci = rng.integers(0, pci_range[cell_tech])
+    cell_rsrp = rng.uniform(-118, -70, size=n_cells)
+
+    tech = cell_tech[cell]
+    # Fading only while driving: a parked phone repeats the same reading
+    fading = np.where(moving, rng.normal(0.0, 4.0, size=seconds), 0.0)
+    fading = fading[np.maximum.accumulate(np.where(moving, np.arange(seconds), 0))]
+    rsrp = np.clip(np.round(cell_rsrp[cell] + fading), -140, -44).astype(np.int64)
+
+    modern = tech <= 1  # LTE / 5G report RSRQ and SINR; 3G / 2G keep SignalService's -20 defaults
+    rsrq = np.where(modern, np.clip(np.round((rsrp + 140) / 8 - 20 + rng.normal(0, 1, seconds)), -20, -3), -20)
+    snr = np.where(modern, np.clip(np.round((rsrp + 120) / 2 + rng.normal(0, 3, seconds)), -20, 30), -20)
+
+    names = np.array(OPERATOR_NAMES.get(operator, [operator]), dtype=object)
+    frame = pd.DataFrame({
+        'Operator': names[rng.integers(0, len(names), size=seconds)],
+        'NetworkType': techs[tech],
+        'PCI': cell_pci[cell],
+        'RSRP': rsrp,
+        'RSRQ': rsrq.astype(np.int64),
+        'SNR': snr.astype(np.int64),
+    })
+    lost = rng.random(seconds) < NO_SIGNAL_SHARE
+    frame.loc[lost, ['NetworkType', 'PCI', 'RSRP', 'RSRQ', 'SNR']] = ['NO_SIGNAL', 0, -140, -20, -20]
+    return frame
+
+def log_name(start):
+    return f"Signal_Log_Advanced_{start:%Y%m%d_%H%M%S}.csv"
+
+def write_day(job):
+    """ Worker: writes one recording per device for one day of the plan; returns the paths """
+    out_dir, day, seconds, devices, operators, slots, pci_churn, stationary_share, seed = job
+    rng = np.random.default_rng(seed)
+    # One extra second per device: device k starts k seconds later on the same route
+    lat, lon, speed, moving = drive_route(seconds + devices, rng, stationary_share)
+    cells = [slot_rows(seconds + devices, moving, rng, pci_churn, operators[(day + s) % len(operators)])
+             for s in range(slots)]
+
+    paths = []
+    for k in range(devices):
+        dev_rng = np.random.default_rng([seed, k])
+        start = START_TIME + pd.Timedelta(days=day, seconds=k)
+        span = slice(k, k + seconds)
+        stamps = (start + pd.to_timedelta(np.arange(seconds), unit='s')).strftime('%H:%M:%S')
+        # Per-device GPS noise, except where parked (the fix repeats there)
+        noise = dev_rng.normal(0.0, 2.0 / 111_320.0, size=(2, seconds)) * moving[span]
+        snr_supported = dev_rng.random() >= SNR_UNSUPPORTED_SHARE
+        gain = int(dev_rng.integers(-4, 5))
+
+        parts = []
+        for s in range(slots):
+            part = cells[s].iloc[span].reset_index(drop=True)
+            if not snr_supported:
+                part['SNR'] = part['SNR'].where(~part['NetworkType'].isin(['LTE', '5G']), SNR_UNSUPPORTED)
+            live = part['NetworkType'] != 'NO_SIGNAL'
+            part['RSRP'] = part['RSRP'].where(~live, (part['RSRP'] + gain).clip(-140, -44))
+            part.insert(0, 'Timestamp', stamps)
+            part.insert(1, 'Latitude', np.round(lat[span] + noise[0], 7))
+            part.insert(2, 'Longitude', np.round(lon[span] + noise[1], 7))
+            part.insert(3, 'Altitude', np.round(550.0 + np.cumsum(dev_rng.normal(0, 0.05, seconds)), 1))
+            part.insert(4, 'Speed', np.round(speed[span], 2))
+            part.insert(6, 'Slot', f"SIM{s + 1}")
+            part['tick'] = np.arange(seconds)
+            parts.append(part)
+
+        # Slot rows of the same tick are written together, as in the app
+        frame = pd.concat(parts, ignore_index=True).sort_values('tick', kind='stable')
+        path = os.path.join(out_dir, log_name(start))
+        frame[LOG_HEADER].to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+def generate_logs(out_dir, rows, rows_per_file=ROWS_PER_FILE, devices=1, operators=DEFAULT_OPERATORS, slots=2,
+                  pci_churn=PCI_CHURN, stationary_share=STATIONARY_SHARE, seed=0, workers=GEN_WORKERS):
+    """
+    Writes about `rows` rows per device into `out_dir`, one recording per device and day of at most
+    `rows_per_file` rows. SIM slot s of day d carries operators[(d + s) % len(operators)].
+    Output depends only on the arguments (not on `workers`). Returns the file paths.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    seconds_per_file = min(max(rows_per_file // slots, 1), MAX_FILE_SECONDS)
+    total_seconds = max(rows // slots, 1)
+    n_days = -(-total_seconds // seconds_per_file)
+    seeds = np.random.SeedSequence(seed).generate_state(n_days)
+    jobs = [
+        (out_dir, day, min(seconds_per_file, total_seconds - day * seconds_per_file), devices, list(operators), slots,
+         pci_churn, stationary_share, int(seeds[day]))
+        for day in range(n_days)
+    ]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            return [p for paths in pool.map(write_day, jobs) for p in paths]
+    return [p for job in jobs for p in write_day(job)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write seeded synthetic SignalService drive logs")
+    parser.add_argument('out_dir')
+    parser.add_argument('--rows', type=int, default=100_000, help="rows per device")
+    parser.add_argument('--rows-per-file', type=int, default=ROWS_PER_FILE)
+    parser.add_argument('--devices', type=int, default=1, help="handsets driving the same route")
+    parser.add_argument('--operators', nargs='+', default=DEFAULT_OPERATORS)
+    parser.add_argument('--slots', type=int, default=2, help="SIM slots per handset")
+    parser.add_argument('--pci-churn', type=float, default=PCI_CHURN, help="handovers per second while driving")
+    parser.add_argument('--stationary', type=float, default=STATIONARY_SHARE, help="share of time spent parked")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=GEN_WORKERS)
+    args = parser.parse_args()
+
+    paths = generate_logs(args.out_dir, args.rows, args.rows_per_file, args.devices, args.operators, args.slots,
+                          args.pci_churn, args.stationary, args.seed, args.workers)
+    print(f"✅ Wrote {len(paths)} logs to '{args.out_dir}'")
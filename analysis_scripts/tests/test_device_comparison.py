@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+import device_comparison as dc
+from trajectory import radian_columns
+
+pytest.importorskip("scipy")
+
+ORIGIN = (42.6977, 23.3219)
+START = pd.Timestamp('2026-01-01 06:00:00')
+
+def device_frame(rng, n, seconds, rows_per_tick=1):
+    """ n samples scattered over ~100 m x 100 m and `seconds` of time; dual-SIM logs repeat every stamp """
+    lat = ORIGIN[0] + rng.uniform(0, 0.0009, n)
+    lon = ORIGIN[1] + rng.uniform(0, 0.0012, n)
+    t = np.repeat(rng.uniform(0, seconds, -(-n // rows_per_tick)), rows_per_tick)[:n]
+    df = pd.DataFrame({'lat': lat, 'lon': lon, 'rsrp': rng.uniform(-120, -70, n),
+                       'datetime': START + pd.to_timedelta(t, unit='s')})
+    df['lat_rad'], df['lon_rad'], df['cos_lat'] = radian_columns(df['lat'], df['lon'])
+    return df
+
+def brute_force(ref, other, max_distance_m, max_time_s=None):
+    """ Index of the nearest `other` row per `ref` row within the tolerances, -1 if none """
+    d_space = np.linalg.norm(dc.sphere_points(ref)[:, None, :] - dc.sphere_points(other)[None, :, :], axis=2)
+    ok = d_space <= max_distance_m
+    d = d_space
+    if max_time_s is not None:
+        d_time = np.abs((ref['datetime'].to_numpy()[:, None] - other['datetime'].to_numpy()[None, :]) / np.timedelta64(1, 's'))
+        ok &= d_time <= max_time_s
+        # match_in_space_time ranks candidates on the time axis scaled to the distance tolerance
+        d = np.hypot(d_space, d_time * max_distance_m / max_time_s)
+    d = np.where(ok, d, np.inf)
+    return np.where(ok.any(axis=1), d.argmin(axis=1), -1)
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_match_in_space_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    ref, other = device_frame(rng, 300, 600), device_frame(rng, 250, 600)
+    idx = dc.match_in_space(ref, other, max_distance_m=5)
+    expected = brute_force(ref, other, 5)
+    assert 0 < (expected >= 0).sum() < len(ref)
+    assert idx.tolist() == expected.tolist()
+
+@pytest.mark.parametrize("seed, rows_per_tick, k", [(0, 1, 8), (1, 2, 8), (2, 2, 1), (3, 1, 1)])
+def test_match_in_space_time_matches_brute_force(seed, rows_per_tick, k):
+    rng = np.random.default_rng(seed)
+    # Dense in space and sparse in time, so the k nearest 4-D candidates often miss and get re-queried
+    ref, other = device_frame(rng, 300, 120), device_frame(rng, 400, 120, rows_per_tick)
+    idx = dc.match_in_space_time(ref, other, max_time_s=2, max_distance_m=15, k=k)
+    expected = brute_force(ref, other, 15, 2)
+    assert 0 < (expected >= 0).sum() < len(ref)
+    assert idx.tolist() == expected.tolist()
+
+def test_match_in_space_time_skips_rows_without_time():
+    rng = np.random.default_rng(4)
+    ref, other = device_frame(rng, 50, 60), device_frame(rng, 80, 60)
+    ref.loc[:9, 'datetime'] = pd.NaT
+    other.loc[:, 'datetime'] = pd.NaT
+    assert (dc.match_in_space_time(ref, other) == -1).all()
+    other = device_frame(rng, 80, 60)
+    idx = dc.match_in_space_time(ref, other)
+    assert (idx[:10] == -1).all()
+    timed = brute_force(ref.iloc[10:].reset_index(drop=True), other, dc.MATCH_DISTANCE_M, dc.MATCH_TIME_S)
+    assert idx[10:].tolist() == timed.tolist()
+
+@pytest.mark.parametrize("kwargs", [{'max_time_s': 0}, {'max_time_s': -1}, {'max_distance_m': 0}, {'max_distance_m': -5}])
+def test_match_locations_rejects_non_positive_tolerances(kwargs):
+    rng = np.random.default_rng(5)
+    dfs = [device_frame(rng, 20, 60), device_frame(rng, 20, 60)]
+    with pytest.raises(ValueError, match="must be > 0"):
+        dc.match_locations(dfs, verbose=False, **kwargs)
+
+def test_match_locations_position_only():
+    rng = np.random.default_rng(6)
+    dfs = [device_frame(rng, 100, 60), device_frame(rng, 100, 60)]
+    merged = dc.match_locations(dfs, max_time_s=None, verbose=False)
+    expected = brute_force(dfs[0], dfs[1], dc.MATCH_DISTANCE_M)
+    assert len(merged) == (expected >= 0).sum()
+    assert merged['rsrp_1'].tolist() == dfs[1]['rsrp'].to_numpy()[expected[expected >= 0]].tolist()
@@ -0,0 +1,126 @@
+import os
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import geo_resolver as gr
+
+PLACE_HTML = '<html><script>window.APP_INITIALIZATION_STATE=[[[1234.5,[42.6977,23.3219]]]];</script></html>'
+
+class StubServer:
+    """ Local HTTP server answering from a list of (status, headers, body); the last answer repeats """
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(self.path)
+                status, headers, body = stub.answers[min(len(stub.requests), len(stub.answers)) - 1]
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    """ Records backoff waits instead of sleeping through them """
+    waits = []
+    monkeypatch.setattr(gr.time, 'sleep', waits.append)
+    return waits
+
+def fetch(url, **kwargs):
+    with gr.make_session() as session:
+        return gr.fetch_page(session, url, gr.TokenBucket(rate=1000, capacity=1000), **kwargs)
+
+@pytest.mark.parametrize('status', [429, 500, 502, 503, 504])
+def test_fetch_retries_transient_status(status, no_sleep):
+    stub = StubServer([(status, {}, ''), (status, {}, ''), (200, {}, PLACE_HTML)])
+    try:
+        assert fetch(stub.url + "/place") == PLACE_HTML
+    finally:
+        stub.close()
+    assert len(stub.requests) == 3
+    assert len(no_sleep) == 2
+
+def test_fetch_gives_up_after_retries(no_sleep):
+    stub = StubServer([(503, {}, '')])
+    try:
+        with pytest.raises(RuntimeError, match="HTTP 503"):
+            fetch(stub.url, retries=2)
+    finally:
+        stub.close()
+    assert len(stub.requests) == 3
+
+def test_fetch_does_not_retry_client_errors(no_sleep):
+    stub = StubServer([(404, {}, 'gone')])
+    try:
+        assert fetch(stub.url) == 'gone'
+    finally:
+        stub.close()
+    assert len(stub.requests) == 1 and not no_sleep
+
+def test_retry_after_is_capped(no_sleep):
+    stub = StubServer([(429, {'Retry-After': '86400'}, ''), (200, {}, PLACE_HTML)])
+    try:
+        fetch(stub.url, backoff=1.0, max_backoff=5.0)
+    finally:
+        stub.close()
+    assert no_sleep and max(no_sleep) <= 5.0 + 0.5
+
+def test_normalize_url_drops_tracking_params():
+    a = gr.normalize_url("HTTPS://www.Google.com/maps/place/X/?utm_source=share&b=2&a=1&entry=ttu#frag")
+    b = gr.normalize_url("https://www.google.com/maps/place/X?a=1&b=2&g_ep=abc")
+    assert a == b == "https://www.google.com/maps/place/X?a=1&b=2"
+
+def test_normalize_url_keeps_meaningful_params():
+    assert gr.normalize_url("https://maps.app/p?q=1") != gr.normalize_url("https://maps.app/p?q=2")
+
+def test_cache_entries_expire_after_ttl(tmp_path):
+    db = gr.open_cache(str(tmp_path / "cache.sqlite"))
+    try:
+        gr.store_coords(db, "https://maps.app/fresh?utm_medium=x", (42.0, 23.0, "html"))
+        gr.store_coords(db, "https://maps.app/stale", (41.0, 22.0, "meta"))
+        db.execute("UPDATE coords SET resolved_at = ? WHERE url = ?",
+                   (time.time() - 31 * 86400, gr.normalize_url("https://maps.app/stale")))
+        db.commit()
+        assert gr.cached_coords(db, ttl_days=30) == {"https://maps.app/fresh": (42.0, 23.0, "html")}
+        assert len(gr.cached_coords(db, ttl_days=60)) == 2
+    finally:
+        db.close()
+
+def test_resolve_urls_serves_cache_hits_without_network(tmp_path, no_sleep):
+    stub = StubServer([(200, {}, PLACE_HTML)])
+    cache, out = str(tmp_path / "cache.sqlite"), str(tmp_path / "out.csv")
+    items = [(2, stub.url + "/place/a?utm_source=1"), (1, stub.url + "/place/a")]
+    try:
+        assert gr.resolve_urls(items, output_name=out, cache_path=cache, workers=1, rate=1000) == 2
+        first = len(stub.requests)
+        assert gr.resolve_urls(items, output_name=out, cache_path=cache, workers=1, rate=1000) == 2
+    finally:
+        stub.close()
+    assert first == 2 and len(stub.requests) == first
+    with open(out, encoding="utf-8") as f:
+        assert f.read().splitlines() == ["ID,Latitude,Longitude", "1,42.6977,23.3219", "2,42.6977,23.3219"]
+
+def test_resolve_urls_writes_nothing_when_nothing_resolves(tmp_path, no_sleep):
+    stub = StubServer([(200, {}, '<html>no coordinates here</html>')])
+    out = str(tmp_path / "out.csv")
+    try:
+        assert gr.resolve_urls([(1, stub.url + "/place")], output_name=out, cache_path=None, rate=1000) == 0
+    finally:
+        stub.close()
+    assert not os.path.exists(out)
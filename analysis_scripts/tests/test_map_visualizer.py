@@ -0,0 +1,182 @@
+import os
+import asyncio
+import argparse
+import pytest
+
+pytest.importorskip("playwright")
+np = pytest.importorskip("numpy")
+from PIL import Image
+import map_visualizer as mv
+
+CAMERA = {'latitude': 42.6977, 'longitude': 23.3219, 'zoom': 11.5}
+
+def test_mercator_round_trip():
+    for lat, lon, zoom in [(42.6977, 23.3219, 11.5), (-33.9, 151.2, 3), (0, 0, 0), (60, -179.5, 16)]:
+        back_lat, back_lon = mv.mercator_latlon(*mv.mercator_px(lat, lon, zoom), zoom)
+        assert back_lat == pytest.approx(lat, abs=1e-9)
+        assert back_lon == pytest.approx(lon, abs=1e-9)
+
+def test_mercator_px_world_square():
+    world = mv.MERCATOR_TILE_PX * 2 ** 4
+    assert mv.mercator_px(0, 0, 4) == pytest.approx((world / 2, world / 2))
+    # Latitudes past the mercator limit clamp to the top edge
+    assert mv.mercator_px(90, -180, 4) == pytest.approx((0, 0), abs=1e-2)
+
+def test_tile_cameras_grid():
+    cols, rows, width, height = 3, 2, 800, 600
+    tiles = mv.tile_cameras({**CAMERA, 'pitch': 45, 'bearing': 30}, cols, rows, width, height)
+    assert [(row, col) for row, col, _ in tiles] == [(r, c) for r in range(rows) for c in range(cols)]
+    assert all(cam['pitch'] == 0 and cam['bearing'] == 0 and cam['zoom'] == CAMERA['zoom'] for _, _, cam in tiles)
+
+    px = {(row, col): mv.mercator_px(cam['latitude'], cam['longitude'], cam['zoom']) for row, col, cam in tiles}
+    # Neighbouring tiles sit exactly one viewport apart
+    for (row, col), (x, y) in px.items():
+        if col + 1 < cols:
+            assert px[row, col + 1][0] - x == pytest.approx(width)
+            assert px[row, col + 1][1] == pytest.approx(y)
+        if row + 1 < rows:
+            assert px[row + 1, col][1] - y == pytest.approx(height)
+            assert px[row + 1, col][0] == pytest.approx(x)
+    # ...and the grid is centred on the camera
+    cx, cy = mv.mercator_px(CAMERA['latitude'], CAMERA['longitude'], CAMERA['zoom'])
+    assert np.mean([x for x, _ in px.values()]) == pytest.approx(cx)
+    assert np.mean([y for _, y in px.values()]) == pytest.approx(cy)
+
+def write_tiles(tile_dir, cols, rows, size=(7, 5)):
+    rng = np.random.default_rng(0)
+    grid, pixels = [], []
+    for row in range(rows):
+        grid.append([])
+        pixels.append([])
+        for col in range(cols):
+            rgba = rng.integers(0, 256, size=(size[1], size[0], 4), dtype=np.uint8)
+            path = os.path.join(tile_dir, f"r{row:03d}_c{col:03d}.png")
+            Image.fromarray(rgba, 'RGBA').save(path)
+            grid[row].append(path)
+            pixels[row].append(rgba[..., :3])
+    return grid, np.concatenate([np.concatenate(row, axis=1) for row in pixels], axis=0)
+
+def test_stitch_tiles_matches_concatenation(tmp_path):
+    grid, expected = write_tiles(str(tmp_path), cols=3, rows=2)
+    out = str(tmp_path / "poster.png")
+    assert mv.stitch_tiles(grid, out, level=1) == (21, 10)
+    with Image.open(out) as poster:
+        assert poster.mode == 'RGB'
+        assert np.array_equal(np.asarray(poster), expected)
+    assert not os.path.exists(out + ".part")
+
+def test_stitch_tiles_missing_tile_leaves_nothing(tmp_path):
+    grid, _ = write_tiles(str(tmp_path), cols=2, rows=2)
+    os.remove(grid[1][1])
+    out = str(tmp_path / "poster.png")
+    with pytest.raises(FileNotFoundError):
+        mv.stitch_tiles(grid, out)
+    assert not os.path.exists(out) and not os.path.exists(out + ".part")
+
+@pytest.mark.parametrize("text, grid", [("6x4", (6, 4)), ("2X3", (2, 3)), ("1x1", (1, 1))])
+def test_tile_grid(text, grid):
+    assert mv.tile_grid(text) == grid
+
+@pytest.mark.parametrize("text", ["6", "axb", "3x4x5", "0x3", "2x-1", ""])
+def test_tile_grid_rejects(text):
+    with pytest.raises(argparse.ArgumentTypeError):
+        mv.tile_grid(text)
+
+def test_render_notes():
+    assert mv.render_notes({'idle': True, 'seconds': 2.0, 'maps': 1}) == []
+    busy, = mv.render_notes({'idle': False, 'seconds': 120.2, 'maps': 2})
+    assert "busy after 120 s" in busy
+    unhooked, busy = mv.render_notes({'idle': False, 'seconds': 120.0, 'maps': 0})
+    assert "network quiet only" in unhooked
+
+class FakeContext:
+    async def close(self):
+        pass
+
+class FakePage:
+    """ Stands in for a Playwright page: idle right away, screenshots are flat tiles except `skip` """
+    def __init__(self, skip=(), maps=1):
+        self.skip = skip
+        self.maps = maps
+
+    async def evaluate(self, script, arg=None):
+        if script == mv.GET_CAMERA_JS:
+            return dict(CAMERA)
+        if script == mv.WAIT_FOR_RENDER_JS:
+            return {'idle': True, 'seconds': 0.0, 'maps': self.maps}
+        return True
+
+    async def screenshot(self, path, clip=None):
+        if os.path.basename(path) not in self.skip:
+            Image.new('RGBA', (clip['width'], clip['height']), (10, 20, 30, 255)).save(path)
+
+def run_tiled(monkeypatch, tmp_path, skip=(), maps=1):
+    async def open_map_page(browser, html_file, width, height, scale):
+        return FakeContext(), FakePage(skip, maps)
+    monkeypatch.setattr(mv, 'open_map_page', open_map_page)
+    html_file = tmp_path / "map.html"
+    html_file.write_text("<html></html>")
+    settings = {'out_dir': str(tmp_path / "renders"), 'width': 8, 'height': 6, 'tiles': {'cols': 2, 'rows': 2}}
+    os.makedirs(settings['out_dir'])
+    return asyncio.run(mv.render_tiled_batch(None, [str(html_file)], {'full': {}, 'city': {'zoom': 12}}, settings, pages=2))
+
+def test_render_tiled_stitches(monkeypatch, tmp_path):
+    results = run_tiled(monkeypatch, tmp_path)
+    assert [error for _, error in results] == [None, None]
+    for path, _ in results:
+        with Image.open(path) as poster:
+            assert poster.size == (16, 12)
+        assert not os.path.exists(os.path.splitext(path)[0] + "_tiles")
+
+def test_render_tiled_missing_tile_is_reported(monkeypatch, tmp_path):
+    results = run_tiled(monkeypatch, tmp_path, skip={"r001_c000.png"})
+    # Every preset comes back with an error instead of the batch raising
+    assert len(results) == 2
+    for path, error in results:
+        assert error and "stitching failed" in error
+        assert not os.path.exists(path)
+        assert os.path.isdir(os.path.splitext(path)[0] + "_tiles")
+
+def test_render_tiled_warns_once_without_a_hooked_map(monkeypatch, tmp_path):
+    results = run_tiled(monkeypatch, tmp_path, maps=0)
+    for path, note in results:
+        assert os.path.exists(path)
+        assert note == mv.render_notes({'idle': True, 'seconds': 0.0, 'maps': 0})[0]
+
+class FakeShotPage(FakePage):
+    async def screenshot(self, path, clip=None):
+        Image.new('RGB', (8, 6)).save(path)
+
+class FakeBrowserError(Exception):
+    pass
+
+def run_maps(monkeypatch, tmp_path, broken):
+    """ render_map over two maps, `broken` failing to open; every output already exists from an earlier run """
+    async def open_map_page(browser, html_file, width, height, scale):
+        if os.path.basename(html_file) == broken:
+            raise FakeBrowserError("navigation timed out")
+        return FakeContext(), FakeShotPage()
+    monkeypatch.setattr(mv, 'open_map_page', open_map_page)
+    settings = {'out_dir': str(tmp_path / "renders"), 'width': 8, 'height': 6, 'scale': 1}
+    os.makedirs(settings['out_dir'])
+    maps = []
+    for name in ("good.html", "bad.html"):
+        (tmp_path / name).write_text("<html></html>")
+        maps.append(str(tmp_path / name))
+        for preset in ("full", "city"):
+            Image.new('RGB', (1, 1)).save(mv.output_path(settings['out_dir'], name, preset))
+
+    async def batch():
+        slots = asyncio.Semaphore(2)
+        return await asyncio.gather(*(mv.render_map(None, m, {'full': {}, 'city': {}}, settings, slots) for m in maps))
+    return dict(zip(("good", "bad"), asyncio.run(batch())))
+
+def test_render_map_open_failure_is_reported(monkeypatch, tmp_path):
+    results = run_maps(monkeypatch, tmp_path, broken="bad.html")
+    assert [error for _, error in results['good']] == [None, None]
+    assert all(os.path.exists(path) for path, _ in results['good'])
+    # The failed map reports every preset, and the stale images of the earlier run are gone
+    assert len(results['bad']) == 2
+    for path, error in results['bad']:
+        assert error == "FakeBrowserError: navigation timed out"
+        assert not os.path.exists(path)
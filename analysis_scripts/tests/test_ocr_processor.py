@@ -0,0 +1,52 @@
+import json
+import pytest
+
+pytest.importorskip("pytesseract")
+from PIL import Image
+import ocr_processor as ocr
+
+@pytest.fixture
+def shots(tmp_path, monkeypatch):
+    """ Two screenshots, OCR replaced by a confident fake reading that counts its calls """
+    folder = tmp_path / "shots"
+    folder.mkdir()
+    for i, shade in enumerate((0, 255)):
+        Image.new('RGB', (40, 30), (shade, shade, shade)).save(folder / f"shot_{i}.png")
+    calls = []
+    def read_lines(img, config):
+        calls.append(config)
+        return [[("RSRP:-95", 91.0), ("SNR:12.5", 88.0)]]
+    monkeypatch.setattr(ocr, 'read_lines', read_lines)
+    monkeypatch.chdir(tmp_path)
+    return folder, calls
+
+def test_cached_readings_are_reused(shots):
+    folder, calls = shots
+    ocr.process_images(str(folder), workers=1)
+    assert len(calls) == 2
+    ocr.process_images(str(folder), workers=1)
+    assert len(calls) == 2
+
+@pytest.mark.parametrize("setting, value", [
+    ('CROP_BOX', (0, 0, 1, 0.5)),
+    ('CROP_PADDING', 3),
+    ('OCR_PASSES', [(130, '--psm 6')]),
+    ('SNR_PATTERN', r"SINR:(\d+\.?\d*)"),
+])
+def test_changed_settings_invalidate_the_cache(shots, monkeypatch, setting, value):
+    folder, calls = shots
+    ocr.process_images(str(folder), workers=1)
+    monkeypatch.setattr(ocr, setting, value)
+    ocr.process_images(str(folder), workers=1)
+    assert len(calls) == 4
+    # Readings of both settings stay in the file, each tagged with its settings
+    with open(folder / ocr.CACHE_FILE, encoding='utf-8') as f:
+        tags = [json.loads(line)['settings'] for line in f]
+    assert len(tags) == 4 and len(set(tags)) == 2
+
+def test_entries_without_settings_are_ignored(shots):
+    folder, calls = shots
+    digest = ocr.image_digest(str(folder / "shot_0.png"))
+    with open(folder / ocr.CACHE_FILE, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"sha1": digest, "RSRP": "-1", "SNR": "N/A", "confidence": 99.0, "passes": []}) + "\n")
+    assert ocr.load_cache(str(folder / ocr.CACHE_FILE), ocr.settings_digest()) == {}
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+import signal_bins as sb
+import network_analyzer as na
+
+SCHEMES = {
+    'rsrp_report': na.RSRP_REPORT_BINS,
+    'rsrp_chart': na.RSRP_CHART_BINS,
+    'snr': na.SNR_BINS,
+    'rsrq': na.RSRQ_BINS,
+}
+
+def probe_values(scheme):
+    """ Every edge, just below and above it, and values far outside the binned range """
+    edges = scheme['edges']
+    return np.concatenate([edges, edges - 1e-6, edges + 1e-6, edges - 0.5, [-1e6, 1e6, edges[0] - 50, edges[-1] + 50]])
+
+@pytest.mark.parametrize("name", SCHEMES)
+def test_codes_match_left_closed_cut(name):
+    scheme = SCHEMES[name]
+    values = probe_values(scheme)
+    cut = pd.cut(values, np.concatenate([[-np.inf], scheme['edges'], [np.inf]]), right=False, labels=scheme['labels'])
+    assert list(sb.bin_labels(values, scheme)) == list(cut)
+    assert sb.bin_codes(values, scheme).tolist() == cut.codes.tolist()
+
+def report_quality(r):
+    """ The report's [1] classifier before signal_bins """
+    if r >= na.RSRP_EXCELLENT: return '1. Excellent'
+    if r >= na.RSRP_GOOD: return '2. Good'
+    if r >= na.RSRP_POOR: return '3. Fair'
+    return '4. Dead Zone'
+
+def chart_quality(r):
+    """ The chart classifier before signal_bins """
+    if r >= -85: return 'Excellent'
+    if r >= -100: return 'Good'
+    if r >= -115: return 'Fair'
+    return 'Poor'
+
+@pytest.mark.parametrize("scheme, classify", [(na.RSRP_REPORT_BINS, report_quality), (na.RSRP_CHART_BINS, chart_quality)])
+def test_rsrp_labels_match_the_old_classifiers(scheme, classify):
+    values = np.concatenate([probe_values(scheme), [np.nan, -140.0, -44.0]])
+    assert list(sb.bin_labels(values, scheme)) == [classify(v) for v in values]
+
+def test_edges_read_as_greater_or_equal():
+    assert sb.bin_codes([4.999, 5.0, 12.999, 13.0, 20.0], na.SNR_BINS).tolist() == [0, 1, 1, 2, 3]
+    assert sb.bin_codes([-15.0, -15.001, -10.0], na.RSRQ_BINS).tolist() == [1, 0, 2]
+
+def test_missing_and_infinite_values():
+    values = [np.nan, -np.inf, np.inf]
+    # NaN goes to the scheme's `missing` label, or code -1 when it has none
+    assert sb.bin_codes(values, na.RSRP_REPORT_BINS).tolist() == [0, 0, 3]
+    assert sb.bin_codes(values, na.SNR_BINS).tolist() == [-1, 0, 3]
+    assert list(sb.bin_labels(values, na.SNR_BINS))[1:] == ['4. Poor', '1. Excellent']
+    assert pd.isna(sb.bin_labels(values, na.SNR_BINS)[0])
+
+def test_bin_table_counts():
+    df = pd.DataFrame({
+        'operator': ['A1', 'A1', 'A1', 'A1', 'YETTEL', 'YETTEL'],
+        'tech': ['4G', '4G', '4G', '3G', '4G', '4G'],
+        'snr': [20.0, 13.0, np.nan, 4.0, 5.0, -3.0],
+    })
+    table = sb.bin_table(df, ['operator', 'tech'], 'snr', na.SNR_BINS)
+    assert list(table.columns) == ['1. Excellent', '2. Good', '3. Fair', '4. Poor']
+    assert table.index.tolist() == [('A1', '3G'), ('A1', '4G'), ('YETTEL', '4G')]
+    # The NaN SNR is not counted anywhere
+    assert table.to_numpy().tolist() == [[0, 0, 0, 1], [1, 1, 0, 0], [0, 0, 1, 1]]
+    assert sb.observed_bins(table).columns.tolist() == ['1. Excellent', '2. Good', '3. Fair', '4. Poor']
+    assert sb.observed_bins(table.iloc[1:2]).columns.tolist() == ['1. Excellent', '2. Good']
+
+@pytest.mark.parametrize("edges, labels", [([1, 2], ['a', 'b']), ([2, 1], ['a', 'b', 'c']), ([1, 1], ['a', 'b', 'c'])])
+def test_make_scheme_rejects_bad_schemes(edges, labels):
+    with pytest.raises(ValueError):
+        sb.make_scheme(edges, labels)
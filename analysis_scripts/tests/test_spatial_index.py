@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+import spatial_index as si
+
+# Both hemispheres and both sides of Greenwich
+CITIES = [(42.6977, 23.3219), (-33.8688, 151.2093), (-0.1807, -78.4678), (61.2181, -149.9003), (51.4779, -0.0015)]
+
+def random_points(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    centre = np.array(CITIES)[rng.integers(0, len(CITIES), n)]
+    return centre[:, 0] + rng.normal(0, 0.05, n), centre[:, 1] + rng.normal(0, 0.05, n)
+
+@pytest.mark.parametrize("precision", [0, 2, 4, 7])
+def test_round_trip_matches_series_round(precision):
+    lat, lon = random_points()
+    # ...plus the corners of the key space and values next to a rounding half
+    lat = np.concatenate([lat, [90.0, -90.0, 0.0, -0.00004, 0.00005]])
+    lon = np.concatenate([lon, [180.0, -180.0, 0.0, -0.00005, 0.00004]])
+    grid_lat, grid_lon = si.cell_centers(si.cell_keys(lat, lon, precision), precision)
+    # Bit-identical to the rounding the maps used before the index
+    assert np.array_equal(grid_lat, pd.Series(lat).round(precision).to_numpy())
+    assert np.array_equal(grid_lon, pd.Series(lon).round(precision).to_numpy())
+
+def test_keys_are_unique_per_cell():
+    lat, lon = random_points()
+    keys = si.cell_keys(lat, lon, 4)
+    cells = pd.DataFrame({'lat': np.round(lat, 4), 'lon': np.round(lon, 4)})
+    assert len(np.unique(keys)) == len(cells.drop_duplicates())
+    assert (keys >= 0).all()
+
+def test_invalid_coordinates():
+    keys = si.cell_keys([np.nan, 42.0, np.inf, 42.0], [23.0, np.nan, 23.0, -np.inf], 4)
+    assert keys.tolist() == [si.INVALID_CELL] * 4
+    assert si.coarsen_cells(keys, 4, 10).tolist() == [si.INVALID_CELL] * 4
+    with pytest.raises(ValueError):
+        si.cell_keys([1.0], [1.0], si.MAX_PRECISION + 1)
+    with pytest.raises(ValueError):
+        si.coarsen_cells(keys, si.MAX_PRECISION, 10)
+    with pytest.raises(ValueError):
+        si.coarsen_cells(keys, 4, 0)
+
+@pytest.mark.parametrize("factor", [1, 2, 3, 10])
+def test_coarse_blocks_are_floor_aligned(factor):
+    precision = 4
+    # Fine cells -25..24 on both axes, i.e. straddling the equator and Greenwich
+    q = np.arange(-25, 25)
+    lat_q, lon_q = (a.ravel() for a in np.meshgrid(q, q))
+    keys = si.cell_keys(lat_q / 1e4, lon_q / 1e4, precision)
+    coarse = si.coarsen_cells(keys, precision, factor)
+
+    # One key per floor(q / factor) block, shared by exactly the fine cells of that block
+    blocks = pd.DataFrame({'lat': lat_q // factor, 'lon': lon_q // factor, 'key': coarse})
+    assert (blocks.groupby(['lat', 'lon'])['key'].nunique() == 1).all()
+    assert blocks.groupby('key')[['lat', 'lon']].nunique().eq(1).all().all()
+
+    # ...and it decodes, one decimal finer, to the block centre
+    centre_lat, centre_lon = si.cell_centers(coarse, precision + 1)
+    assert centre_lat == pytest.approx((lat_q // factor * factor + (factor - 1) / 2) / 1e4, abs=1e-12)
+    assert centre_lon == pytest.approx((lon_q // factor * factor + (factor - 1) / 2) / 1e4, abs=1e-12)
+
+def test_negative_coordinates_round_down_into_their_block():
+    # -0.0001 and -0.0010 share the block [-0.0010, -0.0001]; 0.0000 starts the next one
+    keys = si.cell_keys([-0.0001, -0.0010, 0.0, -0.0011], [-0.0001, -0.0010, 0.0, -0.0011], 4)
+    coarse = si.coarsen_cells(keys, 4, 10)
+    assert coarse[0] == coarse[1]
+    assert len(set(coarse.tolist())) == 3
+    lat, lon = si.cell_centers(coarse, 5)
+    assert lat.tolist() == [-0.00055, -0.00055, 0.00045, -0.00155]
+    assert lon.tolist() == lat.tolist()
+
+@pytest.mark.parametrize("factor", [2, 10, 100])
+def test_coarse_keys_do_not_collide_with_fine_keys(factor):
+    # Coarse keys carry one more decimal, which puts them above every fine key for latitudes
+    # north of -72°, so a key set never mixes up the two grids
+    lat, lon = random_points()
+    fine = si.cell_keys(lat, lon, 4)
+    coarse = si.coarsen_cells(fine, 4, factor)
+    assert not np.isin(coarse, fine).any()
+    assert coarse.min() > si.cell_keys([90.0], [180.0], 4)[0]
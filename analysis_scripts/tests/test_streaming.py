@@ -0,0 +1,56 @@
+import os
+import shutil
+import pandas as pd
+import pytest
+import network_analyzer as na
+import synthetic_logs
+from test_trajectory import sample_frame
+
+REPORT = 'network_comparison_report.txt'
+MAP_KEYS = ['grid_lat', 'grid_lon']
+
+@pytest.fixture(scope='module')
+def log_dir(tmp_path_factory):
+    """ Two dual-SIM handsets on the same route, spread over several files """
+    out = tmp_path_factory.mktemp('logs')
+    synthetic_logs.generate_logs(str(out), rows=6000, rows_per_file=2000, devices=2, seed=7, workers=1)
+    return out
+
+def run(log_dir, tmp_path, name, runner, *args):
+    """ Runs one pipeline over a copy of the logs; returns (report text, {map file: frame}) """
+    work = tmp_path / name
+    shutil.copytree(log_dir, work)
+    cwd = os.getcwd()
+    os.chdir(work)
+    try:
+        runner(*args, export_workers=1, chart_sets=())
+    finally:
+        os.chdir(cwd)
+    export = work / na.EXPORT_DIR
+    maps = {f: pd.read_csv(export / f).sort_values(MAP_KEYS, ignore_index=True)
+            for f in sorted(os.listdir(export)) if f.startswith('signal_map') and f.endswith('.csv')}
+    return (export / REPORT).read_text(encoding='utf-8'), maps
+
+@pytest.fixture(scope='module')
+def in_memory(log_dir, tmp_path_factory):
+    return run(log_dir, tmp_path_factory.mktemp('memory'), 'work', na.run_in_memory)
+
+# 997 rows split tracks mid-run and mid-file; 100_000 holds a whole file per chunk
+@pytest.mark.parametrize("chunk_rows", [997, 100_000])
+def test_stream_matches_in_memory(log_dir, in_memory, tmp_path, chunk_rows):
+    report, maps = in_memory
+    stream_report, stream_maps = run(log_dir, tmp_path, 'work', na.run_streaming, chunk_rows)
+    assert '[3] HANDOVER STABILITY' in report and 'sessions' in report
+    assert stream_report == report
+    assert list(stream_maps) == list(maps) and maps
+    for name, frame in maps.items():
+        pd.testing.assert_frame_equal(stream_maps[name], frame, check_dtype=False, obj=name)
+
+def test_stationary_filter_keeps_file_order_on_equal_timestamps():
+    # Rows of the same stream and second keep their file order (stable sort), so only the repeat is dropped
+    rows = [('phone', 'SIM1', 'A1', 0, 42.0, 23.0, -90.0, 1),
+            ('phone', 'SIM1', 'A1', 1, 42.0, 23.0, -95.0, 1),
+            ('phone', 'SIM1', 'A1', 1, 42.0, 23.0, -90.0, 1),
+            ('phone', 'SIM1', 'A1', 1, 42.0, 23.0, -90.0, 1)]
+    clean = na.remove_stationary_data(sample_frame(rows))
+    assert clean['rsrp'].tolist() == [-90.0, -95.0, -90.0]
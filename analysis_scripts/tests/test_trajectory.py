@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+import trajectory as tr
+import network_analyzer as na
+
+NAN = np.nan
+KM_PER_MILLIDEGREE = tr.EARTH_RADIUS_KM * np.radians(0.001)  # one 0.001° step north
+
+# stream_start, t, lat, lon, rsrp, pci -> session, gap_s, step_km (in 0.001° north), stationary, dwell_s, handover
+ROWS = [
+    # Stream 1: stands still for 10 s, then moves north one step at a time
+    (True,  0,   42.000, 23.0, -90, 1,   0, 0,  0, False, 0,  False),
+    (False, 10,  42.000, 23.0, -90, 1,   0, 0,  0, True,  0,  False),
+    (False, 20,  42.001, 23.0, -90, 1,   0, 20, 1, False, 10, False),
+    (False, 30,  42.002, 23.0, -90, 2,   0, 10, 1, False, 0,  True),
+    # A jump of ~110 km in 10 s is a GPS glitch: new session, no step
+    (False, 40,  43.000, 23.0, -90, 2,   1, 0,  0, False, 0,  False),
+    # The same fix after the timeout is a new session, so not stationary
+    (False, 340, 43.000, 23.0, -90, 2,   2, 0,  0, False, 0,  False),
+    # Same position, new RSRP: moves on without distance
+    (False, 345, 43.000, 23.0, -95, 2,   2, 5,  0, False, 0,  False),
+    # Stream 2 starts earlier in time: new session, no handover against stream 1
+    (True,  0,   10.000, 20.0, -80, 7,   3, 0,  0, False, 0,  False),
+    # A missing PCI counts as a handover, so the row is kept even though nothing else changed
+    (False, 5,   10.000, 20.0, -80, NAN, 3, 5,  0, False, 0,  True),
+    (False, 6,   10.000, 20.0, -80, NAN, 3, 1,  0, False, 0,  True),
+]
+
+def run_segment(rows, **kwargs):
+    start, t, lat, lon, rsrp, pci = (np.array(col, dtype=np.float64) for col in list(zip(*rows))[:6])
+    return tr.segment(start.astype(bool), t, lat, lon, tr.radian_columns(lat, lon), rsrp, pci,
+                      gap_s=300, **kwargs)
+
+def test_segment_table():
+    out = run_segment(ROWS)
+    expected = list(zip(*[row[6:] for row in ROWS]))
+    session, gap, step, stationary, dwell, handover = (np.array(col) for col in expected)
+    assert out['session'].tolist() == session.tolist()
+    assert out['gap_s'] == pytest.approx(gap)
+    assert out['step_km'] == pytest.approx(step * KM_PER_MILLIDEGREE, rel=1e-6)
+    assert out['stationary'].tolist() == stationary.tolist()
+    assert out['dwell_s'] == pytest.approx(dwell)
+    assert out['handover'].tolist() == handover.tolist()
+    moving = gap > 0
+    assert out['track_speed'][moving] == pytest.approx(step[moving] * KM_PER_MILLIDEGREE * 1000 / gap[moving], rel=1e-6)
+    assert np.isnan(out['track_speed'][~moving]).all()
+
+def test_segment_numbers_sessions_from_next_session():
+    assert run_segment(ROWS, next_session=10)['session'].tolist() == [10, 10, 10, 10, 11, 12, 12, 13, 13, 13]
+
+def test_max_speed_is_configurable():
+    out = run_segment(ROWS[:5], max_speed=1e6)
+    assert out['session'].tolist() == [0] * 5
+    assert out['step_km'][4] == pytest.approx(998 * KM_PER_MILLIDEGREE, rel=1e-3)
+
+# ==========================================
+# segment_tracks: stream keys and the streaming carry
+# ==========================================
+def sample_frame(rows):
+    """ Analysis frame from (device, slot, operator, seconds, lat, lon, rsrp, pci) rows """
+    device, slot, operator, t, lat, lon, rsrp, pci = zip(*rows)
+    lat_rad, lon_rad, cos_lat = tr.radian_columns(lat, lon)
+    df = pd.DataFrame({
+        'datetime': pd.Timestamp('2024-05-01') + pd.to_timedelta(t, unit='s'),
+        'lat': lat, 'lon': lon, 'rsrp': rsrp, 'snr': NAN, 'rsrq': NAN, 'speed': NAN,
+        'operator': operator, 'tech': '4G', 'source': 'test', 'pci': pd.array(pci, dtype='Int32'),
+        'device': device, 'slot': slot, 'lat_rad': lat_rad, 'lon_rad': lon_rad, 'cos_lat': cos_lat
+    })
+    return df.astype({c: d for c, d in na.SAMPLE_DTYPES.items() if c in df.columns})
+
+def dual_sim_rows():
+    """ Two devices, one of them dual-SIM, interleaved in time; standing still and moving in turns """
+    rows = []
+    for i in range(60):
+        lat = 42.0 + 0.001 * (i // 3)  # three samples per fix: two of them stationary
+        rows.append(('phone_a', 'SIM1', 'A1', i * 2, lat, 23.0, -90.0, 100 + i // 30))
+        rows.append(('phone_a', 'SIM2', 'VIVACOM', i * 2 + 1, lat, 23.0, -100.0, 200))
+        rows.append(('phone_b', 'SIM1', 'A1', i * 2, lat + 0.5, 23.1, -85.0, 100 + i // 15))
+    # A pause longer than the session timeout on one stream only, back on a new cell
+    rows.append(('phone_b', 'SIM1', 'A1', 120 + na.SESSION_TIMEOUT_SECONDS, 42.6, 23.1, -85.0, 105))
+    return rows
+
+TRACK_COLUMNS = ['gap_s', 'step_km', 'track_speed', 'stationary', 'dwell_s', 'handover']
+
+def test_streams_do_not_mix():
+    df, _ = na.segment_tracks(sample_frame(dual_sim_rows()))
+    for (device, slot), stream in df.groupby(['device', 'slot'], observed=True):
+        # Each stream starts fresh and its own repeats are stationary, whatever the other SIM did in between
+        assert not stream['handover'].iloc[0] and stream['gap_s'].iloc[0] == 0
+        assert stream['stationary'].sum() == 40
+    sessions = df.groupby(['device', 'slot'], observed=True)['session'].nunique()
+    assert sessions.to_dict() == {('phone_a', 'SIM1'): 1, ('phone_a', 'SIM2'): 1, ('phone_b', 'SIM1'): 2}
+    assert df['session'].nunique() == 4
+    # Fixes 0.001° apart, 6 s after the previous run started, 4 s of it standing
+    moved = df[(df['device'] == 'phone_a') & (df['slot'] == 'SIM1') & ~df['stationary']].iloc[1:]
+    assert moved['gap_s'].tolist() == [6.0] * len(moved)
+    assert moved['dwell_s'].tolist() == [4.0] * len(moved)
+    assert moved['step_km'].to_numpy() == pytest.approx([KM_PER_MILLIDEGREE] * len(moved), rel=1e-6)
+    assert df['handover'].sum() == 1 + 4
+
+@pytest.mark.parametrize("chunk_rows", [1, 4, 7, 50])
+def test_carry_across_chunks(chunk_rows):
+    rows = dual_sim_rows()
+    whole, _ = na.segment_tracks(sample_frame(rows))
+
+    parts, carry = [], None
+    for start in range(0, len(rows), chunk_rows):
+        part, carry = na.segment_tracks(sample_frame(rows[start:start + chunk_rows]), carry)
+        parts.append(part)
+    chunked = na.concat_samples(parts).sort_values(na.STREAM_KEYS + ['datetime'], kind='stable', ignore_index=True)
+
+    pd.testing.assert_frame_equal(chunked[TRACK_COLUMNS], whole[TRACK_COLUMNS])
+    # Session ids are numbered differently, but split the rows the same way
+    pairs = pd.crosstab(chunked['session'], whole['session'])
+    assert ((pairs > 0).sum(axis=1) == 1).all() and ((pairs > 0).sum(axis=0) == 1).all()
@@ -0,0 +1,130 @@
+import numpy as np
+
+# ==========================================
+# TRAJECTORY SEGMENTATION
+# ==========================================
+# Input rows are sorted by stream (one per device + SIM slot + operator), then time. Each stream is cut
+# into *sessions* at gaps of `gap_s` seconds or more. Inside a session a row is *stationary* when it
+# repeats the previous row's rounded position, RSRP and PCI; every other row is kept and starts a *run*
+# that the stationary repeats after it belong to. Steps (time, distance, speed) of a kept row are
+# measured from the previous run start, i.e. from the previous kept row of the session.
+EARTH_RADIUS_KM = 6371.0
+POSITION_PRECISION = 5  # ~1 m; finer jitter than this counts as "not moved"
+MAX_TRACK_SPEED = 70.0  # m/s (~250 km/h); a faster jump between fixes is a GPS glitch and breaks the session
+TIME_RESOLUTION_S = 1.0  # SignalService timestamps are whole seconds
+SHORT_STEP_KM = 10.0  # equirectangular error stays below ~3 cm up to here
+
+# ==========================================
+# DISTANCE ENGINE
+# ==========================================
+def radian_columns(lat, lon):
+    """ (lat_rad, lon_rad, cos_lat) per sample, computed once at load time and reused by every step """
+    lat_rad = np.radians(np.asarray(lat, dtype=np.float64))
+    lon_rad = np.radians(np.asarray(lon, dtype=np.float64))
+    return lat_rad, lon_rad, np.cos(lat_rad).astype(np.float32)
+
+def step_km(lat1, lon1, cos1, lat2, lon2, cos2, out=None):
+    """
+    Great-circle km between radian points: equirectangular (mean cos(lat)) for steps up to SHORT_STEP_KM,
+    haversine from the same cosines beyond that. No trig for short steps; `out` is reused if given.
+    """
+    dlat = np.subtract(lat2, lat1)
+    dlon = np.subtract(lon2, lon1)
+    x = np.add(cos1, cos2, dtype=np.float64)
+    x *= 0.5
+    x *= dlon
+    out = np.hypot(dlat, x, out=out)
+    out *= EARTH_RADIUS_KM
+
+    far = out > SHORT_STEP_KM
+    if far.any():
+        a = np.sin(dlat[far] / 2)**2 + cos1[far].astype(np.float64) * cos2[far] * np.sin(dlon[far] / 2)**2
+        out[far] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    return out
+
+# ==========================================
+# SEGMENTATION KERNEL
+# ==========================================
+
+def _previous(a):
+    """ a shifted down by one row; row 0 repeats itself (callers always mask it as a stream start) """
+    return np.concatenate([a[:1], a[:-1]])
+
+def _forward_fill_index(defined):
+    """ Per row, the index of the last row at or before it where `defined` is True """
+    return np.maximum.accumulate(np.where(defined, np.arange(len(defined)), 0))
+
+def segment(stream_start, t, lat, lon, rad, rsrp, pci, gap_s, carried=None, next_session=0,
+            max_speed=MAX_TRACK_SPEED):
+    """
+    One vectorised pass over rows sorted by (stream, time); `t` is in seconds, `lat`/`lon` in degrees and
+    `rad` the matching radian_columns() triple. Besides time gaps, a session also breaks where the implied
+    speed from the previous kept row exceeds `max_speed`, so GPS jumps never count as distance.
+
+    `carried` marks rows replayed from the previous chunk when streaming (the last row of each stream);
+    it is a dict with a 'mask' plus their 'run_t', 'run_lat', 'run_lon', 'run_cos' and 'session' state.
+    Sessions continued from a carried row keep its id, new sessions are numbered from `next_session`.
+
+    Returns a dict of per-row arrays: session, gap_s, step_km (both 0 where a session starts),
+    track_speed (m/s), stationary, dwell_s (how long the previous run of the session stood still before
+    this kept row, part of its gap_s), handover (PCI changed), plus the run_* state.
+    """
+    n = len(t)
+    stream_start = np.asarray(stream_start, dtype=bool)
+    brk = stream_start | (t - _previous(t) >= gap_s)
+
+    lat_r = np.round(lat, POSITION_PRECISION)
+    lon_r = np.round(lon, POSITION_PRECISION)
+    handover = ~stream_start & ~(pci == _previous(pci))  # NaN PCI on either side counts as a change
+    stationary = ~brk & ~handover & (lat_r == _previous(lat_r)) & (lon_r == _previous(lon_r)) & (rsrp == _previous(rsrp))
+    kept = ~stationary
+
+    # Run start (time, radian position) of every row; carried rows bring their own
+    lat_rad, lon_rad, cos_lat = rad
+    run_state = {'run_t': t, 'run_lat': lat_rad, 'run_lon': lon_rad, 'run_cos': cos_lat}
+    if carried is not None:
+        mask = carried['mask']
+        run_state = {k: np.where(mask, carried[k], v).astype(v.dtype) for k, v in run_state.items()}
+    run = _forward_fill_index(kept)
+    run_state = {k: v[run] for k, v in run_state.items()}
+
+    step = np.flatnonzero(kept & ~brk)
+    prev = step - 1
+    gap = np.zeros(n)
+    dist = np.zeros(n)
+    dwell = np.zeros(n)
+    gap[step] = t[step] - run_state['run_t'][prev]
+    # The row before a kept row is the last one of the previous run, so only local rows are needed
+    dwell[step] = t[prev] - run_state['run_t'][prev]
+    dist[step] = step_km(run_state['run_lat'][prev], run_state['run_lon'][prev], run_state['run_cos'][prev],
+                         lat_rad[step], lon_rad[step], cos_lat[step])
+
+    jump = np.zeros(n, dtype=bool)
+    jump[step] = dist[step] * 1000.0 > max_speed * np.maximum(gap[step], TIME_RESOLUTION_S)
+    brk |= jump
+    gap[jump] = 0.0
+    dist[jump] = 0.0
+    dwell[jump] = 0.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        track_speed = np.where(gap > 0, dist * 1000.0 / gap, np.nan)
+
+    # Session ids: continue a carried row's session, number the new ones consecutively
+    local = np.cumsum(brk)
+    ids = np.full(local[-1] + 1 if n else 1, -1, dtype=np.int64)
+    if carried is not None:
+        mask = carried['mask']
+        ids[local[mask]] = carried['session'][mask]
+    fresh = ids < 0
+    fresh[0] = False
+    ids[fresh] = next_session + np.arange(fresh.sum())
+
+    return {
+        'session': ids[local],
+        'gap_s': gap,
+        'step_km': dist,
+        'track_speed': track_speed,
+        'stationary': stationary,
+        'dwell_s': dwell,
+        'handover': handover,
+        **run_state
+    }